@@ -2,7 +2,7 @@ import json
 import logging
 import os
 from dataclasses import asdict, dataclass, field
-from typing import Optional
+from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -88,19 +88,12 @@ class AlarmThresholdManager:
             logger.warning('[AlarmThresholds] 加载配置文件失败: path=%s, error=%s', self._file_path, e, exc_info=True)
             return
 
-    def save(self, data: dict) -> bool:
+    def save(self, data: Dict[str, ThresholdConfig]) -> bool:
+        # 调用方 (路由层 pydantic 模型) 已完成类型校验与转换
         updated = 0
         for key, config in data.items():
             if hasattr(self.thresholds, key):
-                setattr(
-                    self.thresholds,
-                    key,
-                    ThresholdConfig(
-                        warning_max=float(config.get('warning_max', 0.0)),
-                        alarm_max=float(config.get('alarm_max', 0.0)),
-                        enabled=bool(config.get('enabled', True)),
-                    ),
-                )
+                setattr(self.thresholds, key, config)
                 updated += 1
 
         try:
@@ -2,7 +2,7 @@ from datetime import datetime, timedelta, timezone
 import logging
 from typing import Any, Dict, List, Optional
 
-from app.core.influxdb import get_influx_client, write_point
+from app.core.influxdb import flux_value, get_query_api, write_point
 from config import get_settings
 
 settings = get_settings()
@@ -70,15 +70,15 @@ def query_alarms(
         end_time = end_time.replace(tzinfo=timezone.utc)
 
     effective_level = level if level else 'alarm'
-    level_filter = f'  |> filter(fn: (r) => r["level"] == "{effective_level}")'
+    level_filter = f'  |> filter(fn: (r) => r["level"] == "{flux_value(effective_level)}")'
 
     # 1. param_names 优先 (多参数一次查询): contains() Flux 过滤
     # 2. 如果只有单个 param_name 则用简单等式过滤
     if param_names and len(param_names) > 0:
-        names_flux = ', '.join(f'"{n}"' for n in param_names)
+        names_flux = ', '.join(f'"{flux_value(n)}"' for n in param_names)
         param_filter = f'  |> filter(fn: (r) => contains(value: r["param_name"], set: [{names_flux}]))'
     elif param_name:
-        param_filter = f'  |> filter(fn: (r) => r["param_name"] == "{param_name}")'
+        param_filter = f'  |> filter(fn: (r) => r["param_name"] == "{flux_value(param_name)}")'
     else:
         param_filter = ''
 
@@ -94,22 +94,20 @@ from(bucket: "{settings.influx_bucket}")
 '''
 
     try:
-        client = get_influx_client()
-        tables = client.query_api().query(query)
+        records = get_query_api().query_stream(query)
         results: List[Dict[str, Any]] = []
-        for table in tables:
-            for record in table.records:
-                results.append(
-                    {
-                        'time': record.get_time().isoformat(),
-                        'device_id': record.values.get('device_id', ''),
-                        'sensor_type': record.values.get('sensor_type', ''),
-                        'param_name': record.values.get('param_name', ''),
-                        'level': record.values.get('level', ''),
-                        'value': record.values.get('value'),
-                        'threshold': record.values.get('threshold'),
-                    }
-                )
+        for record in records:
+            results.append(
+                {
+                    'time': record.get_time().isoformat(),
+                    'device_id': record.values.get('device_id', ''),
+                    'sensor_type': record.values.get('sensor_type', ''),
+                    'param_name': record.values.get('param_name', ''),
+                    'level': record.values.get('level', ''),
+                    'value': record.values.get('value'),
+                    'threshold': record.values.get('threshold'),
+                }
+            )
         return results
     except Exception as error:
         logger.warning(
@@ -140,14 +138,12 @@ from(bucket: "{settings.influx_bucket}")
 '''
 
     try:
-        client = get_influx_client()
-        tables = client.query_api().query(query)
+        records = get_query_api().query_stream(query)
         # warning 统一为 0: 当前只记录 alarm 级别, 保留字段以兼容前端 AlarmCount 模型
         counts = {'warning': 0, 'alarm': 0, 'total': 0}
-        for table in tables:
-            for record in table.records:
-                count = int(record.get_value() or 0)
-                counts['alarm'] += count
+        for record in records:
+            count = int(record.get_value() or 0)
+            counts['alarm'] += count
         counts['total'] = counts['alarm']
         return counts
     except Exception as error:
@@ -3,19 +3,25 @@
 # ============================================================
 # 方法列表:
 # 1. get_influx_client()    - 获取InfluxDB客户端
+#    get_query_api()        - 获取查询API单例
 # 2. check_influx_health()  - 检查InfluxDB健康状态
+#    ping_influx()          - 轻量存活探测 (/ping)
 # 3. write_point()          - 写入单个数据点
 # 4. write_points()         - 批量写入数据点
 # 5. write_points_batch()   - 批量写入（带返回值）
 # 6. build_point()          - 构建Point对象
+#    timestamp_ns()         - datetime 转纳秒时间戳
 # 7. query_data()           - 查询历史数据
+# 8. flux_value() / flux_duration() - Flux 查询参数校验
+#    duration_seconds()     - 简单时长转秒数
 # ============================================================
 
-from influxdb_client import InfluxDBClient, Point
+from influxdb_client import InfluxDBClient, Point, QueryApi
 from influxdb_client.client.write_api import SYNCHRONOUS, WriteApi
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime, timezone
 import logging
+import re
 import threading
 
 from config import get_settings
@@ -33,6 +39,20 @@ _influx_client: Optional[InfluxDBClient] = None
 # 3, 全局写入 API - 避免每次写入创建新实例 (修复资源泄漏)
 _write_api: Optional[WriteApi] = None
 
+# 4, 全局查询 API - 与 write_api 相同，避免每次查询创建新实例
+_query_api: Optional[QueryApi] = None
+
+# 8, Flux 查询参数白名单 (模块加载时编译一次)
+# tag 值/字段名只允许字母数字和 _ - . : ，杜绝引号/插值 ${} 拼接进 Flux
+_FLUX_VALUE_RE = re.compile(r'[A-Za-z0-9_.:\-]+')
+# 聚合间隔 (如 30s, 5m, 1h, 1h30m)
+_FLUX_DURATION_RE = re.compile(r'(?:\d+(?:ns|us|ms|mo|s|m|h|d|w|y))+')
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# 2, HTTP 连接池大小 (urllib3 keep-alive 复用连接)
+_CONNECTION_POOL_MAXSIZE = 32
+
 
 # ------------------------------------------------------------
 # 1. get_influx_client() - 获取InfluxDB客户端
@@ -50,6 +70,9 @@ def get_influx_client() -> InfluxDBClient:
             org=settings.influx_org,
             enable_gzip=True,
             timeout=30_000,  # 30秒超时
+            # 连接池上限覆盖 to_thread 线程池 + 后台写线程的并发，
+            # 避免并发查询时超出池容量的连接用完即弃、下次重新握手
+            connection_pool_maxsize=_CONNECTION_POOL_MAXSIZE,
         )
     return _influx_client
 
@@ -65,13 +88,27 @@ def _get_write_api() -> WriteApi:
     return _write_api
 
 
+def get_query_api() -> QueryApi:
+    """获取查询 API 单例
+    
+    # 4, 复用 query_api 实例；客户端关闭时一并重置，重建后自动绑定新 client
+    """
+    global _query_api
+    if _query_api is None:
+        _query_api = get_influx_client().query_api()
+    return _query_api
+
+
 def close_influx_client() -> None:
     """关闭 InfluxDB 客户端（应用退出时调用）
     
     # 3, 先关闭 write_api
     # 2, 再关闭 client
     """
-    global _influx_client, _write_api
+    global _influx_client, _write_api, _query_api
+    
+    # 4, query_api 无需关闭，丢弃引用即可
+    _query_api = None
     
     # 3, 先关闭 write_api
     if _write_api is not None:
@@ -113,6 +150,22 @@ def check_influx_health() -> Tuple[bool, str]:
         return (False, str(e))
 
 
+def ping_influx() -> Tuple[bool, str]:
+    """
+    轻量存活探测: 调用 InfluxDB /ping（不做 /health 的依赖检查），
+    复用单例客户端的连接池
+    
+    Returns:
+        (alive, message)
+    """
+    try:
+        if get_influx_client().ping():
+            return (True, "InfluxDB 正常")
+        return (False, "InfluxDB /ping 无响应")
+    except Exception as e:
+        return (False, str(e))
+
+
 # ------------------------------------------------------------
 # 3. write_point() - 写入单个数据点
 # ------------------------------------------------------------
@@ -199,40 +252,50 @@ def write_points_batch(points: List[Point]) -> Tuple[bool, str]:
 # ------------------------------------------------------------
 # 6. build_point() - 构建Point对象
 # ------------------------------------------------------------
-def build_point(measurement: str, tags: Dict[str, str], fields: Dict[str, Any], timestamp: Optional[datetime] = None) -> Optional[Point]:
+def build_point(measurement: str, tags: Dict[str, str], fields: Dict[str, Any], timestamp: Optional[Union[datetime, int]] = None) -> Optional[Point]:
     """
     构建 InfluxDB Point 对象（供外部批量使用）
     
+    Args:
+        timestamp: datetime 或 timestamp_ns() 预先换算好的纳秒时间戳
+    
     Returns:
         Point 对象或 None (如果字段为空)
     """
     return _build_point(measurement, tags, fields, timestamp)
 
 
-def _build_point(measurement: str, tags: Dict[str, str], fields: Dict[str, Any], timestamp: Optional[datetime] = None) -> Optional[Point]:
+def timestamp_ns(dt: datetime) -> int:
+    """datetime 转 UTC 纳秒时间戳 (无时区信息时视为 UTC，与 build_point 一致)
+    
+    同一时刻写入多个 Point 时先换算一次，避免每个 Point 序列化时重复做 datetime 运算
+    """
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    delta = dt - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000_000 + delta.microseconds * 1000
+
+
+def _build_point(measurement: str, tags: Dict[str, str], fields: Dict[str, Any], timestamp: Optional[Union[datetime, int]] = None) -> Optional[Point]:
     """内部方法：构建 Point 对象
     
     # 4, 跳过 None 值和字符串字段 (InfluxDB 类型冲突)
-    # 5, 确保时间戳带 UTC 时区
+    # 5, 确保时间戳带 UTC 时区 (整数时间戳为 UTC 纳秒，直接使用)
     """
-    point = Point(measurement)
-    
-    for k, v in tags.items():
-        point = point.tag(k, v)
-    
-    valid_fields = 0
-    for k, v in fields.items():
-        # 4, 跳过无效字段
-        if v is None or isinstance(v, str):
-            continue
-        point = point.field(k, v)
-        valid_fields += 1
-    
-    if valid_fields == 0:
+    # 4, 跳过无效字段 (全部无效时不创建 Point)
+    valid_fields = {k: v for k, v in fields.items() if v is not None and not isinstance(v, str)}
+    if not valid_fields:
         return None
     
+    # 批量填充 tag/field 字典，等价于逐个 .tag()/.field() 链式调用 (省去每个键一次方法调用)
+    point = Point(measurement)
+    point._tags.update(tags)
+    point._fields.update(valid_fields)
+    
     # 5, 时间戳处理: 无时区信息时假设为 UTC (修复原来的 astimezone 错误)
-    if timestamp:
+    if isinstance(timestamp, int):
+        point = point.time(timestamp)
+    elif timestamp:
         if timestamp.tzinfo is None:
             timestamp = timestamp.replace(tzinfo=timezone.utc)
         else:
@@ -268,13 +331,14 @@ def query_data(
         查询结果列表
     """
     try:
-        client = get_influx_client()
-        query_api = client.query_api()
+        query_api = get_query_api()
         
-        # 6, 构建 Flux 查询
+        # 6, 构建 Flux 查询 (参数经白名单校验)
+        measurement = flux_value(measurement)
+        interval = flux_duration(interval)
         tag_filter = ""
         if tags:
-            tag_conditions = [f'r["{k}"] == "{v}"' for k, v in tags.items()]
+            tag_conditions = [f'r["{flux_value(k)}"] == "{flux_value(v)}"' for k, v in tags.items()]
             tag_filter = f" |> filter(fn: (r) => {' and '.join(tag_conditions)})"
         
         query = f'''
@@ -286,21 +350,57 @@ def query_data(
             |> yield(name: "mean")
         '''
         
-        result = query_api.query(query)
+        records = query_api.query_stream(query)
         
         # 7, 解析结果
         data = []
-        for table in result:
-            for record in table.records:
-                data.append({
-                    "time": record.get_time(),
-                    "field": record.get_field(),
-                    "value": record.get_value(),
-                    **{k: v for k, v in record.values.items() if not k.startswith("_")}
-                })
+        for record in records:
+            data.append({
+                "time": record.get_time(),
+                "field": record.get_field(),
+                "value": record.get_value(),
+                **{k: v for k, v in record.values.items() if not k.startswith("_")}
+            })
         
         return data
     except Exception as e:
         logger.error("[InfluxDB] 查询失败: %s", e, exc_info=True)
         return []
 
+
+# ------------------------------------------------------------
+# 8. flux_value() / flux_duration() - Flux 查询参数校验
+#    duration_seconds()     - 简单时长转秒数
+# ------------------------------------------------------------
+def flux_value(value: Any) -> str:
+    """校验拼接进 Flux 字符串字面量的 tag 值/字段名
+    
+    Raises:
+        ValueError: 含有白名单以外的字符
+    """
+    text = str(value)
+    if not _FLUX_VALUE_RE.fullmatch(text):
+        raise ValueError(f"非法查询参数: {text!r}")
+    return text
+
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def duration_seconds(value: Optional[str]) -> Optional[int]:
+    """简单时长 (如 30s, 5m, 1h) 转秒数，复合/非法时长返回 None"""
+    if not value or not value[:-1].isdigit() or value[-1] not in _DURATION_UNITS:
+        return None
+    return max(int(value[:-1]) * _DURATION_UNITS[value[-1]], 1)
+
+
+def flux_duration(value: Any) -> str:
+    """校验拼接进 Flux 的时长字面量 (aggregateWindow every 等)
+    
+    Raises:
+        ValueError: 不是合法的 Flux duration
+    """
+    text = str(value)
+    if not _FLUX_DURATION_RE.fullmatch(text):
+        raise ValueError(f"非法聚合间隔: {text!r}")
+    return text
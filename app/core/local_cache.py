@@ -12,7 +12,7 @@ import atexit
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 from typing import Dict, Any, List, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 
 from config import get_settings
 
@@ -37,7 +37,8 @@ class CachedPoint:
     created_at: str = ""
     
     def to_json(self) -> str:
-        return json.dumps(asdict(self), ensure_ascii=False)
+        # 字段都是 JSON 基本类型，直接序列化 __dict__ (asdict 会深拷贝 tags/fields)
+        return json.dumps(self.__dict__, ensure_ascii=False)
     
     @classmethod
     def from_json(cls, json_str: str) -> 'CachedPoint':
@@ -147,12 +148,18 @@ class LocalCache:
                     (max_retry, limit)
                 )
                 results = []
+                bad_ids = []
                 for row in cursor.fetchall():
                     try:
                         point = CachedPoint.from_json(row[1])
                         results.append((row[0], point))
                     except Exception:
-                        pass  # 跳过解析失败的记录
+                        bad_ids.append(row[0])
+                # 解析失败的记录永远无法重试，一次性删除，避免长期占据队首
+                if bad_ids:
+                    placeholders = ",".join("?" * len(bad_ids))
+                    self._conn.execute(f"DELETE FROM pending_points WHERE id IN ({placeholders})", bad_ids)
+                    self._conn.commit()
                 return results
             except Exception as e:
                 print(f"❌ 读取本地缓存失败: {e}")
@@ -211,8 +218,16 @@ class LocalCache:
         with self._db_lock:
             try:
                 cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+                # 先探测是否存在待清理记录 (与 DELETE 条件相同)，没有则不发起 DELETE (不占用写锁)
+                where = "created_at < ? AND retry_count >= 5"
+                probe = self._conn.execute(
+                    f"SELECT 1 FROM pending_points WHERE {where} LIMIT 1",
+                    (cutoff,)
+                )
+                if probe.fetchone() is None:
+                    return
                 cursor = self._conn.execute(
-                    "DELETE FROM pending_points WHERE created_at < ? AND retry_count >= 5",
+                    f"DELETE FROM pending_points WHERE {where}",
                     (cutoff,)
                 )
                 deleted = cursor.rowcount
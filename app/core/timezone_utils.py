@@ -4,11 +4,22 @@
 # 统一使用北京时间 (UTC+8)
 # ============================================================
 
+import time
 from datetime import datetime, timezone, timedelta
 
+# 可选: ciso8601 (C 扩展，ISO 字符串解析更快)，未安装时回退 datetime.fromisoformat
+try:
+    from ciso8601 import parse_datetime as _parse_iso
+except ImportError:
+    _parse_iso = None
+
 # 北京时区 (UTC+8)
 BEIJING_TZ = timezone(timedelta(hours=8))
 
+# 轮询 tick 时间戳缓存 (同一 tick 内多个解析器共用)
+_tick_iso: str = ""
+_tick_mono: float = 0.0
+
 
 def now_beijing() -> datetime:
     """获取当前北京时间"""
@@ -30,6 +41,37 @@ def to_beijing(dt: datetime) -> datetime:
     return dt.astimezone(BEIJING_TZ)
 
 
+def beijing_to_utc_naive(dt: datetime) -> datetime:
+    """将查询参数时间转换为 UTC naive 时间（用于拼接 Flux range 的 ...Z）
+    
+    Args:
+        dt: datetime对象，无时区信息时视为北京时间（前端通常传北京时间）
+    
+    Returns:
+        UTC 时间（去掉时区信息）
+    """
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=BEIJING_TZ)
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def parse_iso_datetime(value: str) -> datetime:
+    """解析 ISO8601 时间字符串（支持 "Z" 结尾）
+    
+    Args:
+        value: 如 "2025-12-26T07:30:00Z" / "2025-12-26T15:30:00+08:00"
+    
+    Returns:
+        datetime对象（字符串不带时区时为 naive）
+    
+    Raises:
+        ValueError: 格式非法
+    """
+    if _parse_iso is not None:
+        return _parse_iso(value)
+    return datetime.fromisoformat(value)
+
+
 def beijing_isoformat(dt: datetime = None) -> str:
     """获取北京时间的ISO格式字符串
     
@@ -44,3 +86,23 @@ def beijing_isoformat(dt: datetime = None) -> str:
     elif dt.tzinfo is None or dt.tzinfo == timezone.utc:
         dt = to_beijing(dt)
     return dt.isoformat()
+
+
+def tick_isoformat(min_age: float = 0.05) -> str:
+    """获取当前轮询 tick 的北京时间 ISO 字符串
+    
+    同一 tick 内多个解析器依次调用时只格式化一次，
+    距上次刷新超过 min_age 秒才重新取时间。
+    
+    Args:
+        min_age: 缓存有效期（秒）
+    
+    Returns:
+        ISO格式字符串，如 "2025-12-26T15:30:00.123456+08:00"
+    """
+    global _tick_iso, _tick_mono
+    now = time.monotonic()
+    if now - _tick_mono > min_age:
+        _tick_iso = now_beijing().isoformat()
+        _tick_mono = now
+    return _tick_iso
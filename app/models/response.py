@@ -4,11 +4,28 @@
 # 模型列表:
 # 1. ApiResponse            - 通用API响应
 # 2. PaginatedResponse      - 分页响应
+# 3. FastJSONResponse       - 默认响应类 (优先 orjson)
+# 4. json_bytes()           - 序列化为 JSON bytes (NDJSON 流式输出用)
+# 5. error_response()       - 失败响应 (按端点缓存已编码的响应体)
 # ============================================================
 
+import json
+import logging
+from fastapi import Response
 from pydantic import BaseModel, Field
 from typing import TypeVar, Generic, Optional, List, Any
 
+# orjson 为可选依赖: 安装后使用 ORJSONResponse (C 实现序列化)，否则回退标准 JSONResponse
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+    ORJSON_AVAILABLE = True
+except ImportError:
+    from fastapi.responses import JSONResponse as FastJSONResponse
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
 T = TypeVar('T')
 
 
@@ -48,3 +65,34 @@ class PaginatedResponse(BaseModel, Generic[T]):
     success: bool = True
     data: List[T] = Field(default_factory=list)
     pagination: Pagination
+
+
+# ------------------------------------------------------------
+# 4. json_bytes() - 序列化为 JSON bytes
+# ------------------------------------------------------------
+def json_bytes(content: Any) -> bytes:
+    """序列化为 JSON bytes，编码规则与 FastJSONResponse 一致"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+# ------------------------------------------------------------
+# 5. error_response() - 失败响应 (按端点缓存已编码的响应体)
+# ------------------------------------------------------------
+# {key: (error, body)}，InfluxDB 不可用等持续故障期间每个请求的错误都相同
+_error_bodies: dict = {}
+
+
+def error_response(key: str, error: str) -> Response:
+    """失败响应，响应体与 ApiResponse.fail(error) 相同
+
+    同一端点错误信息不变时直接复用已编码的响应体，
+    日志 (含 traceback) 只在错误变化时记录一次，需在 except 块中调用。
+    """
+    cached = _error_bodies.get(key)
+    if cached is None or cached[0] != error:
+        logger.warning("[%s] %s", key, error, exc_info=True)
+        cached = (error, json_bytes({"success": False, "data": None, "error": error}))
+        _error_bodies[key] = cached
+    return Response(content=cached[1], media_type="application/json")
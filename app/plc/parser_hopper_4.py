@@ -9,7 +9,20 @@ import struct
 import yaml
 from typing import Dict, List, Any
 from pathlib import Path
-from datetime import datetime
+
+from app.core.timezone_utils import tick_isoformat
+
+# 优先使用 libyaml 的 C 解析器 (与 polling_service 一致)，未编译 libyaml 时回退纯 Python 版本
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# S7-1200 使用大端序 (Big Endian)，按 data_type (大写) 预编译
+_STRUCTS = {
+    "WORD": struct.Struct('>H'),
+    "DWORD": struct.Struct('>I'),
+    "INT": struct.Struct('>h'),
+    "DINT": struct.Struct('>i'),
+    "REAL": struct.Struct('>f'),
+}
 
 class Hopper4Parser:
     """料仓传感器综合解析器 (DB4)
@@ -39,6 +52,8 @@ class Hopper4Parser:
         
         self.config = None
         self.base_modules = {}
+        # 字段解析计划 {(base_module 名, 模块大小): [(name, Struct/'BOOL'/None, offset, bit, scale, display_name, unit), ...]}
+        self._field_plans = {}
         self.load_config()
         
     def load_config(self):
@@ -49,7 +64,7 @@ class Hopper4Parser:
                 print(f"[Parser] 基础模块配置不存在: {self.module_config_path}")
             else:
                 with open(self.module_config_path, 'r', encoding='utf-8') as f:
-                    module_config = yaml.safe_load(f)
+                    module_config = yaml.load(f, Loader=_YAML_LOADER)
                     for module in module_config.get('modules', []):
                         self.base_modules[module['name']] = module
                     
@@ -58,7 +73,7 @@ class Hopper4Parser:
                 print(f"[Parser] DB4 配置文件不存在: {self.config_path}")
             else:
                 with open(self.config_path, 'r', encoding='utf-8') as f:
-                    self.config = yaml.safe_load(f)
+                    self.config = yaml.load(f, Loader=_YAML_LOADER)
             
             db_num = self.config.get('db_number', 4) if self.config else 4
             size = self.config.get('total_size', 176) if self.config else 176
@@ -66,37 +81,34 @@ class Hopper4Parser:
         except Exception as e:
             print(f"[Parser] Hopper4Parser 加载配置失败: {e}")
 
-    def _parse_field_value(self, module_data: bytes, field: Dict[str, Any]) -> Any:
-        """解析单个字段的基础数据类型"""
-        offset = field['offset']
-        data_type = field['data_type']
+    @staticmethod
+    def _build_field_plan(base_module: Dict[str, Any], size: int) -> List[tuple]:
+        """把基础模块的字段定义转换为解析计划 (每个模块首次解析时构建一次)
         
-        try:
-            # S7-1200 使用大端序 (Big Endian)
-            if data_type == 'Word' or data_type == 'WORD':
-                val = struct.unpack('>H', module_data[offset:offset+2])[0]
-            elif data_type == 'DWord' or data_type == 'DWORD':
-                val = struct.unpack('>I', module_data[offset:offset+4])[0]
-            elif data_type == 'Int' or data_type == 'INT':
-                val = struct.unpack('>h', module_data[offset:offset+2])[0]
-            elif data_type == 'DInt' or data_type == 'DINT':
-                val = struct.unpack('>i', module_data[offset:offset+4])[0]
-            elif data_type == 'Real' or data_type == 'REAL':
-                val = struct.unpack('>f', module_data[offset:offset+4])[0]
-            elif data_type == 'Bool' or data_type == 'BOOL':
-                bit_offset = field.get('bit', 0)
-                byte_val = module_data[offset]
-                val = bool(byte_val & (1 << bit_offset))
+        data_type 的判断、Struct 选择、scale/display_name/unit 默认值都在这里做一次，
+        轮询时每个字段只剩一次 unpack_from。
+        超出模块大小的字段和未知类型的字段 Struct 为 None (解析结果为 0，与原逐字段判断一致)。
+        """
+        plan = []
+        for field in base_module.get('fields', []):
+            data_type = str(field['data_type']).upper()
+            offset = field['offset']
+            if data_type == 'BOOL':
+                unpacker = 'BOOL' if offset < size else None
             else:
-                val = 0
-                
-            # 应用缩放
-            scale = field.get('scale', 1.0)
-            if isinstance(val, (int, float)):
-                val = val * scale
-            return val
-        except Exception:
-            return 0
+                unpacker = _STRUCTS.get(data_type)
+                if unpacker is not None and offset + unpacker.size > size:
+                    unpacker = None
+            plan.append((
+                field['name'],
+                unpacker,
+                offset,
+                field.get('bit', 0),
+                field.get('scale', 1.0),
+                field.get('display_name', field['name']),
+                field.get('unit', ''),
+            ))
+        return plan
 
     def parse_module(self, module_info: Dict, db_data: bytes) -> Dict[str, Any]:
         """解析单个模块的所有字段"""
@@ -104,26 +116,34 @@ class Hopper4Parser:
         offset = module_info['offset']
         size = module_info['size']
         
-        if base_module_name not in self.base_modules:
-            print(f"[Parser] 未找到基础模块定义: {base_module_name}")
-            return {}
-            
-        base_module = self.base_modules[base_module_name]
+        plan = self._field_plans.get((base_module_name, size))
+        if plan is None:
+            if base_module_name not in self.base_modules:
+                print(f"[Parser] 未找到基础模块定义: {base_module_name}")
+                return {}
+            plan = self._field_plans[(base_module_name, size)] = self._build_field_plan(
+                self.base_modules[base_module_name], size
+            )
         
         # 边界检查
         if offset + size > len(db_data):
             print(f"[Parser] 模块偏移越界: {base_module_name} (offset {offset}, size {size})")
             return {}
-            
-        module_data = db_data[offset : offset + size]
         
+        # 直接在整块数据上按 (模块偏移 + 字段偏移) 解包，不再复制模块切片
         parsed_fields = {}
-        for field in base_module.get('fields', []):
-            val = self._parse_field_value(module_data, field)
-            parsed_fields[field['name']] = {
-                'value': val,
-                'display_name': field.get('display_name', field['name']),
-                'unit': field.get('unit', '')
+        for name, unpacker, field_offset, bit, scale, display_name, unit in plan:
+            if unpacker is None:
+                val = 0
+            elif unpacker == 'BOOL':
+                val = bool(db_data[offset + field_offset] & (1 << bit))
+            else:
+                val = unpacker.unpack_from(db_data, offset + field_offset)[0]
+            # 应用缩放 (bool 是 int 子类，与原逻辑一致同样参与缩放)
+            parsed_fields[name] = {
+                'value': val * scale,
+                'display_name': display_name,
+                'unit': unit
             }
                 
         return {
@@ -147,7 +167,7 @@ class Hopper4Parser:
             'device_id': 'hopper_unit_4',
             'device_name': '4号料仓综合监测单元',
             'device_type': 'hopper_sensor_unit',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': tick_isoformat(),
             'modules': {}
         }
         
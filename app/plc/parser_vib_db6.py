@@ -11,7 +11,11 @@ import struct
 import yaml
 from typing import Dict, List, Any
 from pathlib import Path
-from datetime import datetime
+
+from app.core.timezone_utils import tick_isoformat
+
+# 优先使用 libyaml 的 C 解析器 (与 polling_service 一致)，未编译 libyaml 时回退纯 Python 版本
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
 
 # DB6 字段名 -> 输出字段名 映射
@@ -34,6 +38,16 @@ _FIELD_MAPPING = {
 # 需要合并为 vibration 模块的 module_type 列表
 _VIBRATION_MODULES = {"vel", "dis_f", "freq"}
 
+# 数据类型 -> 预编译 Struct (S7-1200 大端序)
+# data_type 在 load_config 中统一转为大写，未知类型直接拒绝
+_STRUCTS = {
+    "INT": struct.Struct('>h'),
+    "WORD": struct.Struct('>H'),
+    "DINT": struct.Struct('>i'),
+    "DWORD": struct.Struct('>I'),
+    "REAL": struct.Struct('>f'),
+}
+
 
 class VibDB6Parser:
     """振动传感器解析器 (DB6)
@@ -56,6 +70,9 @@ class VibDB6Parser:
         """
         self.config_path = Path(config_path) if config_path else self.PROJECT_ROOT / "configs" / "config_hopper_vib_db6.yaml"
         self.config = None
+        self.total_size = 0
+        # 每个模块一次 unpack_from 的解析计划: [(module, Struct, 按偏移排序的 fields), ...]
+        self._module_layouts = []
         self.load_config()
         
     def load_config(self):
@@ -66,55 +83,79 @@ class VibDB6Parser:
                 return
                 
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                self.config = yaml.safe_load(f)
-            
-            db_num = self.config.get('db_number', 6)
-            size = self.config.get('total_size', 38)
-            print(f"[Parser] VibDB6Parser 初始化完成: DB{db_num}, 总大小{size}字节")
+                self.config = yaml.load(f, Loader=_YAML_LOADER)
         except Exception as e:
             print(f"[Parser] VibDB6Parser 加载配置失败: {e}")
+            self.config = None
+            return
+        
+        # 边界检查只在加载时做一次，配置错误直接启动失败，轮询热路径不再逐次判断
+        self._validate_layout()
+        
+        db_num = self.config.get('db_number', 6)
+        print(f"[Parser] VibDB6Parser 初始化完成: DB{db_num}, 总大小{self.total_size}字节")
 
-    def _parse_field_value(self, db_data: bytes, field: Dict[str, Any]) -> Any:
-        """解析单个字段值（使用绝对偏移量）"""
-        offset = field['offset']
-        data_type = field['data_type']
+    def _validate_layout(self):
+        """校验所有模块/字段偏移不越过 total_size，并规范化字段类型
         
-        try:
-            if data_type in ('Int', 'INT'):
-                val = struct.unpack('>h', db_data[offset:offset+2])[0]
-            elif data_type in ('Word', 'WORD'):
-                val = struct.unpack('>H', db_data[offset:offset+2])[0]
-            elif data_type in ('DInt', 'DINT'):
-                val = struct.unpack('>i', db_data[offset:offset+4])[0]
-            elif data_type in ('DWord', 'DWORD'):
-                val = struct.unpack('>I', db_data[offset:offset+4])[0]
-            elif data_type in ('Real', 'REAL'):
-                val = struct.unpack('>f', db_data[offset:offset+4])[0]
-            else:
-                val = 0
+        data_type 统一转为大写、scale 补齐默认值，解析时无需再判断。
+        同时把每个模块的字段合成一个 Struct (字段间空隙用填充字节)，
+        解析时一个模块只需一次 unpack_from。
+        
+        Raises:
+            ValueError: 模块或字段越界/重叠，或 data_type 不受支持
+        """
+        self.total_size = self.config.get('total_size', 38)
+        self._module_layouts = []
+        
+        for module in self.config.get('modules', []):
+            module_type = module['module_type']
+            offset = module['offset']
+            size = module['size']
+            if offset < 0 or offset + size > self.total_size:
+                raise ValueError(
+                    f"DB6 模块偏移越界: {module_type} (offset {offset}, size {size}, total_size {self.total_size})"
+                )
+            
+            for field in module.get('fields', []):
+                data_type = str(field['data_type']).upper()
+                if data_type not in _STRUCTS:
+                    raise ValueError(f"DB6 字段类型不支持: {module_type}.{field['name']} ({field['data_type']})")
+                field['data_type'] = data_type
+                field['scale'] = field.get('scale', 1.0)
                 
-            scale = field.get('scale', 1.0)
-            if isinstance(val, (int, float)):
-                val = val * scale
-            return val
-        except Exception:
-            return 0
+                field_offset = field['offset']
+                field_size = _STRUCTS[data_type].size
+                if field_offset < offset or field_offset + field_size > offset + size:
+                    raise ValueError(
+                        f"DB6 字段偏移越界: {module_type}.{field['name']} (offset {field_offset}, size {field_size})"
+                    )
+            
+            # 合成模块级 Struct: 如 vel 三个 Int 连续 -> '>hhh'
+            fields = sorted(module.get('fields', []), key=lambda f: f['offset'])
+            fmt = '>'
+            cursor = offset
+            for field in fields:
+                if field['offset'] < cursor:
+                    raise ValueError(f"DB6 字段重叠: {module_type}.{field['name']} (offset {field['offset']})")
+                if field['offset'] > cursor:
+                    fmt += f"{field['offset'] - cursor}x"
+                fmt += _STRUCTS[field['data_type']].format[1:]
+                cursor = field['offset'] + _STRUCTS[field['data_type']].size
+            self._module_layouts.append((module, struct.Struct(fmt), fields))
 
-    def _parse_module_fields(self, module_info: Dict, db_data: bytes) -> Dict[str, Any]:
-        """解析单个模块的所有字段（返回原始 field dict）"""
-        offset = module_info['offset']
-        size = module_info['size']
+    def _parse_module_fields(self, module_info: Dict, layout: struct.Struct, fields: List[Dict], db_data: bytes) -> Dict[str, Any]:
+        """解析单个模块的所有字段（返回原始 field dict）
         
-        if offset + size > len(db_data):
-            print(f"[Parser] 模块偏移越界: {module_info['module_type']} (offset {offset}, size {size})")
-            return {}
+        类型和偏移已在 load_config 中校验，整个模块一次 unpack_from，不再逐字段分支。
+        """
+        values = layout.unpack_from(db_data, module_info['offset'])
         
         parsed_fields = {}
-        for field in module_info.get('fields', []):
-            val = self._parse_field_value(db_data, field)
+        for field, raw in zip(fields, values):
             field_name = field['name']
             parsed_fields[field_name] = {
-                'value': val,
+                'value': raw * field['scale'],
                 'display_name': field.get('display_name', field_name),
                 'unit': field.get('unit', '')
             }
@@ -129,21 +170,26 @@ class VibDB6Parser:
         """
         if not self.config:
             return []
+        
+        # 整块长度只检查一次 (模块/字段偏移已在 load_config 中校验)
+        if len(db_data) < self.total_size:
+            print(f"[Parser] DB6 数据长度不足: {len(db_data)} < {self.total_size}")
+            return []
             
         device_result = {
             'device_id': 'hopper_vib_6',
             'device_name': '料仓振动传感器(DB6)',
             'device_type': 'vibration_sensor',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': tick_isoformat(),
             'modules': {}
         }
         
         # 1. 收集 vibration 三组核心数据 (vel/dis_f/freq -> 合并为 vibration)
         vibration_fields = {}
         
-        for module in self.config.get('modules', []):
+        for module, layout, fields in self._module_layouts:
             module_type = module['module_type']
-            parsed = self._parse_module_fields(module, db_data)
+            parsed = self._parse_module_fields(module, layout, fields, db_data)
             if not parsed:
                 continue
                 
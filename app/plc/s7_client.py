@@ -169,30 +169,37 @@ class S7Client:
 # ------------------------------------------------------------
 # 全局客户端实例（单例模式，保持长连接）
 # ------------------------------------------------------------
-import threading
+import _thread
 
+# 单例引用的赋值在 GIL 下是原子的: 一旦非 None，读取方无需加锁
 _s7_client: Optional[S7Client] = None
-_s7_client_lock = threading.Lock()
+# 仅首次创建时使用，直接用底层锁，省去 threading.Lock 的包装
+_s7_client_lock = _thread.allocate_lock()
 
 
 def get_s7_client() -> S7Client:
-    """获取S7客户端单例（线程安全，自动建立长连接）"""
+    """获取S7客户端单例（线程安全，自动建立长连接）
+    
+    已创建后直接返回，不获取锁；仅首次创建走双重检查加锁。
+    """
     global _s7_client
-    if _s7_client is None:
-        with _s7_client_lock:
-            if _s7_client is None:
-                settings = get_settings()
-                _s7_client = S7Client(
-                    ip=settings.plc_ip,
-                    rack=settings.plc_rack,
-                    slot=settings.plc_slot,
-                    timeout_ms=settings.plc_timeout
-                )
-                # 自动建立长连接
-                try:
-                    _s7_client.connect()
-                except Exception as e:
-                    print(f" 初始化 PLC 连接失败: {e}")
+    client = _s7_client
+    if client is not None:
+        return client
+    with _s7_client_lock:
+        if _s7_client is None:
+            settings = get_settings()
+            _s7_client = S7Client(
+                ip=settings.plc_ip,
+                rack=settings.plc_rack,
+                slot=settings.plc_slot,
+                timeout_ms=settings.plc_timeout
+            )
+            # 自动建立长连接
+            try:
+                _s7_client.connect()
+            except Exception as e:
+                print(f" 初始化 PLC 连接失败: {e}")
     return _s7_client
 
 
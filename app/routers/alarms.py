@@ -1,13 +1,14 @@
 import asyncio
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 
 from fastapi import APIRouter, Query
 from pydantic import BaseModel, Field
 
-from app.alarm_thresholds import AlarmThresholdManager
+from app.alarm_thresholds import AlarmThresholdManager, ThresholdConfig
 from app.core.alarm_store import get_alarm_count, log_alarm, query_alarms
-from app.models.response import ApiResponse
+from app.core.timezone_utils import parse_iso_datetime
+from app.models.response import ApiResponse, error_response
 
 router = APIRouter(prefix='/alarms', tags=['报警'])
 
@@ -22,6 +23,12 @@ class AlarmReportRequest(BaseModel):
     timestamp: Optional[datetime] = Field(None)
 
 
+class ThresholdUpdate(BaseModel):
+    warning_max: float = Field(0.0)
+    alarm_max: float = Field(0.0)
+    enabled: bool = Field(True)
+
+
 @router.get('/thresholds')
 async def get_thresholds():
     try:
@@ -32,10 +39,14 @@ async def get_thresholds():
 
 
 @router.put('/thresholds')
-async def update_thresholds(body: dict):
+async def update_thresholds(body: Dict[str, ThresholdUpdate]):
     try:
         manager = AlarmThresholdManager.get_instance()
-        ok = await asyncio.to_thread(manager.save, body)
+        configs = {
+            key: ThresholdConfig(warning_max=item.warning_max, alarm_max=item.alarm_max, enabled=item.enabled)
+            for key, item in body.items()
+        }
+        ok = await asyncio.to_thread(manager.save, configs)
         if ok:
             return ApiResponse.ok({'updated': len(body), 'message': '阈值配置已保存'})
         return ApiResponse.fail('保存阈值配置失败')
@@ -56,9 +67,9 @@ async def get_alarm_records(
         start_dt: Optional[datetime] = None
         end_dt: Optional[datetime] = None
         if start:
-            start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
+            start_dt = parse_iso_datetime(start)
         if end:
-            end_dt = datetime.fromisoformat(end.replace('Z', '+00:00'))
+            end_dt = parse_iso_datetime(end)
 
         # 1. 解析逗号分隔的 param_names (多参数一次查询)
         names_list = None
@@ -77,7 +88,7 @@ async def get_alarm_records(
         )
         return ApiResponse.ok({'records': records, 'count': len(records)})
     except Exception as error:
-        return ApiResponse.fail(str(error))
+        return error_response("alarms.records", str(error))
 
 
 @router.get('/count')
@@ -87,7 +98,7 @@ async def get_count(hours: int = Query(24, ge=1, le=168)):
         counts = await asyncio.to_thread(get_alarm_count, hours=hours)
         return ApiResponse.ok(counts)
     except Exception as error:
-        return ApiResponse.fail(str(error))
+        return error_response("alarms.count", str(error))
 
 
 @router.post('/report')
@@ -124,12 +135,12 @@ async def get_alarm_history(
         start_dt: Optional[datetime] = None
         end_dt: Optional[datetime] = None
         if start:
-            start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
+            start_dt = parse_iso_datetime(start)
         if end:
-            end_dt = datetime.fromisoformat(end.replace('Z', '+00:00'))
+            end_dt = parse_iso_datetime(end)
 
         # [FIX] InfluxDB 查询在线程池中执行
         records = await asyncio.to_thread(query_alarms, start_time=start_dt, end_time=end_dt, limit=limit)
         return ApiResponse.ok({'records': records, 'count': len(records)})
     except Exception as error:
-        return ApiResponse.fail(str(error))
+        return error_response("alarms.history", str(error))
@@ -14,7 +14,8 @@ import asyncio
 from fastapi import APIRouter
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import Optional
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
 
 from config import get_settings
 from app.models.response import ApiResponse
@@ -23,18 +24,20 @@ router = APIRouter()
 settings = get_settings()
 
 # 运行时 PLC 配置（支持热更新）
-_runtime_plc_config = {
+# 不可变快照: 更新时须构造新字典并整体替换引用（一次赋值），
+# 读取方不会看到 ip/slot 新旧混杂的中间状态
+_runtime_plc_config: Mapping[str, Any] = MappingProxyType({
     "ip_address": settings.plc_ip,
     "rack": settings.plc_rack,
     "slot": settings.plc_slot,
     "timeout_ms": settings.plc_timeout,
     "poll_interval": settings.plc_poll_interval
-}
+})
 
 
-def get_runtime_plc_config():
-    """获取运行时 PLC 配置"""
-    return _runtime_plc_config.copy()
+def get_runtime_plc_config() -> Mapping[str, Any]:
+    """获取运行时 PLC 配置（只读快照，无需复制）"""
+    return _runtime_plc_config
 
 
 # 配置更新模型
@@ -65,7 +68,11 @@ async def get_server_config():
 @router.get("/plc")
 async def get_plc_config():
     """获取PLC配置（返回运行时配置）"""
-    return ApiResponse.ok(get_runtime_plc_config())
+    return ApiResponse.ok(dict(get_runtime_plc_config()))
+
+
+# 只读拒绝响应体固定不变，导入时构造一次
+_PLC_READONLY_BODY = ApiResponse.fail("PLC配置为只读，请修改后端 .env 文件并重启服务后生效").model_dump()
 
 
 # ------------------------------------------------------------
@@ -91,10 +98,7 @@ async def get_plc_config():
 )
 async def update_plc_config(config: PLCConfigUpdate):
     """PLC 配置只读：拒绝写入"""
-    return JSONResponse(
-        status_code=403,
-        content=ApiResponse.fail("PLC配置为只读，请修改后端 .env 文件并重启服务后生效").model_dump(),
-    )
+    return JSONResponse(status_code=403, content=_PLC_READONLY_BODY)
 
 
 # ------------------------------------------------------------
@@ -105,6 +109,7 @@ async def test_plc_connection():
     """测试PLC连接（使用当前运行时配置）"""
     # [FIX] PLC 连接测试在线程池中执行，避免阻塞事件循环
     def _do_plc_test():
+        # s7_client 直接依赖 snap7 (可选依赖)，保持延迟导入
         from app.plc.s7_client import get_s7_client
         client = get_s7_client()
         if not client.is_connected():
@@ -6,14 +6,27 @@
 # 2. GET /health/plc        - PLC连接状态
 # 3. GET /health/database   - 数据库连接状态
 # 4. GET /health/polling    - 轮询服务状态
+# 5. GET /health/diagnose   - 全0数据诊断
+# 6. GET /health/latest-timestamp - 数据库最新时间戳
+# 7. GET|HEAD /ping         - 进程存活探测
 # ============================================================
 
 import asyncio
-from fastapi import APIRouter
+import time
+from fastapi import APIRouter, Response
 from datetime import datetime
+from typing import Dict, Optional, Tuple
 
 from app.models.response import ApiResponse
-from app.services.polling_service import get_polling_stats, is_polling_running
+from app.core.influxdb import ping_influx
+from app.plc.plc_manager import get_plc_manager
+from app.services.history_query_service import get_history_service
+from app.services.polling_service import (
+    get_latest_data,
+    get_latest_timestamp as get_cache_timestamp,
+    get_polling_stats,
+    is_polling_running,
+)
 
 router = APIRouter(prefix="/api", tags=["health"])
 
@@ -50,7 +63,6 @@ async def plc_health(probe: bool = True):
         internal_state: 内部状态变量（调试用）
     """
     try:
-        from app.plc.plc_manager import get_plc_manager
         plc = get_plc_manager()
         # [FIX] 同步 snap7 调用放到线程池，不阻塞事件循环
         status = await asyncio.to_thread(plc.get_status, check_realtime=probe)
@@ -76,20 +88,31 @@ async def plc_health(probe: bool = True):
 # ------------------------------------------------------------
 # 3. GET /health/database - 数据库连接状态
 # ------------------------------------------------------------
+# InfluxDB 探测结果缓存 (monotonic_time, healthy, msg)，1 秒内的重复探测直接复用
+_DB_HEALTH_TTL = 1.0
+_db_health_cache: Optional[Tuple[float, bool, str]] = None
+
+
 @router.get("/health/database")
 async def database_health():
     """数据库连接状态检查
     
     [FIX] 改为 async def + asyncio.to_thread()，避免同步 InfluxDB 调用阻塞事件循环
+    使用 /ping 探测（比 /health 更轻），结果缓存 1 秒，合并高频存活探测
     """
+    global _db_health_cache
     status = {
         "influxdb": {"connected": False}
     }
     
     # [FIX] 检查InfluxDB - 在线程池中执行同步网络 I/O
     try:
-        from app.core.influxdb import check_influx_health
-        healthy, msg = await asyncio.to_thread(check_influx_health)
+        cached = _db_health_cache
+        if cached is not None and time.monotonic() - cached[0] < _DB_HEALTH_TTL:
+            healthy, msg = cached[1], cached[2]
+        else:
+            healthy, msg = await asyncio.to_thread(ping_influx)
+            _db_health_cache = (time.monotonic(), healthy, msg)
         status["influxdb"]["connected"] = healthy
         if not healthy:
             status["influxdb"]["error"] = msg
@@ -127,6 +150,79 @@ async def polling_health():
 
 # ------------------------------------------------------------
 # 5. GET /health/diagnose - 全面诊断（排查全0数据问题）
+# ------------------------------------------------------------
+def _is_all_zero(fields: Dict) -> bool:
+    """模块的数值字段是否全为 0 (没有数值字段时不算全 0)，遇到首个非零值即返回"""
+    has_numeric = False
+    for value in fields.values():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if value:
+                return False
+            has_numeric = True
+    return has_numeric
+
+
+# 诊断结果最多列出的全 0 模块数
+_DIAGNOSE_MAX_ZERO_MODULES = 10
+
+# 诊断结果缓存 ((缓存时间戳, 轮询状态), result)：缓存数据每个轮询周期才变化一次
+_diagnose_cache: Optional[Tuple[tuple, Dict]] = None
+
+
+@router.get("/health/diagnose")
+async def diagnose_zero_data():
+    """全面诊断: 检查内存缓存中数值字段全为 0 的模块
+
+    全 0 通常意味着 PLC 读到了空 DB 块或偏移配置错误。
+    数值字段按各模块自身的字段判断，在首个非零值处短路；
+    找到 _DIAGNOSE_MAX_ZERO_MODULES 个全 0 模块后停止逐字段扫描 (truncated = True)，
+    之后只按设备累计模块总数。
+    同一轮询周期内的重复请求直接返回缓存结果。
+    """
+    global _diagnose_cache
+    try:
+        cache_key = (get_cache_timestamp(), is_polling_running())
+        cached = _diagnose_cache
+        if cached is not None and cached[0] == cache_key:
+            return ApiResponse.ok(cached[1])
+
+        cache_data = get_latest_data()
+
+        zero_modules = []
+        total_modules = 0
+        truncated = False
+        for device_id, device_data in cache_data.items():
+            modules = device_data.get("modules", {})
+            total_modules += len(modules)
+            if truncated:
+                continue
+
+            for module_tag, module_info in modules.items():
+                if _is_all_zero(module_info.get("fields", {})):
+                    zero_modules.append({
+                        "device_id": device_id,
+                        "module_tag": module_tag,
+                        "module_type": module_info.get("module_type", ""),
+                    })
+                    if len(zero_modules) >= _DIAGNOSE_MAX_ZERO_MODULES:
+                        truncated = True
+                        break
+
+        result = {
+            "polling_running": cache_key[1],
+            "latest_timestamp": cache_key[0],
+            "devices_in_cache": len(cache_data),
+            "total_modules": total_modules,
+            "zero_module_count": len(zero_modules),
+            "zero_modules": zero_modules,
+            "truncated": truncated,
+            "has_zero_data": bool(zero_modules),
+        }
+        _diagnose_cache = (cache_key, result)
+        return ApiResponse.ok(result)
+    except Exception as e:
+        return ApiResponse.fail(f"诊断失败: {str(e)}")
+
 
 # ------------------------------------------------------------
 # 6. GET /health/latest-timestamp - 获取数据库中最新数据的时间戳
@@ -145,7 +241,6 @@ async def get_latest_timestamp():
         timestamp_utc: UTC时间戳
     """
     try:
-        from app.services.history_query_service import get_history_service
         service = get_history_service()
         # [FIX] InfluxDB 查询在线程池中执行
         latest_time = await asyncio.to_thread(service.get_latest_db_timestamp)
@@ -165,3 +260,12 @@ async def get_latest_timestamp():
             })
     except Exception as e:
         return ApiResponse.fail(f"获取最新时间戳失败: {str(e)}")
+
+
+# ------------------------------------------------------------
+# 7. GET|HEAD /ping - 进程存活探测（不访问 PLC / InfluxDB）
+# ------------------------------------------------------------
+@router.api_route("/ping", methods=["GET", "HEAD"])
+async def ping():
+    """进程存活探测，供负载均衡/容器编排高频调用"""
+    return Response(status_code=200)
@@ -1,27 +1,81 @@
 # 4号料仓设备API路由
 
-from fastapi import APIRouter, Query, Path
-from typing import Optional
+from fastapi import APIRouter, Query, Path, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 from datetime import datetime, timedelta
 import asyncio
+import sys
+import time
 
-from app.models.response import ApiResponse
+from app.models.response import ApiResponse, FastJSONResponse, error_response, json_bytes
+from app.core.timezone_utils import beijing_to_utc_naive, now_beijing
+from app.core.influxdb import flux_value
+from app.tools import FIELD_NAMES
 from app.services.history_query_service import get_history_service
 from app.services.polling_service import (
-    get_latest_data,
+    get_latest_devices_by_type,
     get_latest_timestamp,
     is_polling_running
 )
 
 router = APIRouter(prefix="/api/hopper", tags=["料仓设备"])
 
-HOPPER_TYPES = ["hopper_sensor_unit"]
+HOPPER_TYPES = frozenset({"hopper_sensor_unit"})
+
+# /realtime/batch 响应体缓存: 缓存数据每个轮询周期才变化一次
+# key = (最新时间戳, 轮询运行状态)，时间戳变化即失效
+_batch_body_cache: dict = {"key": None, "body": b""}
+
+
+# 历史查询结果缓存 {key: (monotonic_time, data)}
+# 看板会反复请求同一时间窗口，key 使用查询实际使用的 UTC 起止时间和聚合间隔 (与服务器本地时区无关)
+_HISTORY_CACHE_TTL = 30.0
+_HISTORY_CACHE_MAX = 512
+_history_cache: dict = {}
+
+def _parse_field_name(name: str) -> Optional[str]:
+    """转换器输出字段取驻留字符串；其他字段 (如 DB6 的 accel_x/temp 等按解析器原始字段名写入)
+    只要是合法的 Flux 字段名同样接受，非法字段名返回 None"""
+    known = FIELD_NAMES.get(name)
+    if known is not None:
+        return known
+    try:
+        return sys.intern(flux_value(name))
+    except ValueError:
+        return None
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """解析逗号分隔的字段参数，丢弃非法字段名 (去重，返回驻留字符串)"""
+    if not fields:
+        return None
+    names = (_parse_field_name(name.strip()) for name in fields.split(","))
+    return list(dict.fromkeys(name for name in names if name is not None))
+
+
+def _history_cache_get(key: tuple):
+    entry = _history_cache.get(key)
+    if entry is not None and time.monotonic() - entry[0] < _HISTORY_CACHE_TTL:
+        return entry[1]
+    return None
+
+
+def _history_cache_put(key: tuple, data) -> None:
+    if len(_history_cache) >= _HISTORY_CACHE_MAX:
+        # 先清过期项，仍满则淘汰最早写入的一项
+        now = time.monotonic()
+        for k in [k for k, (t, _) in _history_cache.items() if now - t >= _HISTORY_CACHE_TTL]:
+            del _history_cache[k]
+        if len(_history_cache) >= _HISTORY_CACHE_MAX:
+            del _history_cache[next(iter(_history_cache))]
+    _history_cache[key] = (time.monotonic(), data)
 
 
 # ============================================================
 # 1. GET /api/hopper/realtime/batch - 批量获取所有料仓实时数据（内存缓存）
 # ============================================================
-@router.get("/realtime/batch")
+@router.get("/realtime/batch", response_class=FastJSONResponse)
 async def get_all_hoppers_realtime():
     """批量获取所有料仓实时数据（从内存缓存读取）
 
@@ -31,38 +85,44 @@ async def get_all_hoppers_realtime():
     - 电表模块 (module_type = electricity): Ua_0/Ua_1/Ua_2(V), I_0/I_1/I_2(A), Pt(kW), ImpEp(kWh)
     - 振动模块 (module_type = vibration): vx/vy/vz(mm/s), dx/dy/dz(um), hzx/hzy/hzz(Hz)
     """
+    global _batch_body_cache
     try:
-        all_data = get_latest_data()
-        devices_data = [
-            data for data in all_data.values()
-            if data.get("device_type") in HOPPER_TYPES
-        ]
+        timestamp = get_latest_timestamp()
+        polling_running = is_polling_running()
+        cache_key = (timestamp, polling_running)
 
-        if not devices_data:
-            return ApiResponse.ok({
-                "total": 0,
-                "source": "cache",
-                "timestamp": get_latest_timestamp(),
-                "polling_running": is_polling_running(),
-                "warning": "缓存为空，轮询服务可能未启动或首次轮询未完成",
-                "devices": []
-            })
-
-        return ApiResponse.ok({
+        # 同一轮询周期内的重复请求直接返回已序列化的字节
+        cached = _batch_body_cache
+        if cached["key"] == cache_key and cached["body"]:
+            return Response(content=cached["body"], media_type="application/json")
+
+        devices_data = []
+        for hopper_type in HOPPER_TYPES:
+            devices_data.extend(get_latest_devices_by_type(hopper_type))
+
+        # 高频接口: 跳过 ApiResponse 的 pydantic 校验和 jsonable_encoder
+        data = {
             "total": len(devices_data),
             "source": "cache",
-            "timestamp": get_latest_timestamp(),
-            "polling_running": is_polling_running(),
-            "devices": devices_data
-        })
+            "timestamp": timestamp,
+            "polling_running": polling_running,
+        }
+        if not devices_data:
+            data["warning"] = "缓存为空，轮询服务可能未启动或首次轮询未完成"
+        data["devices"] = devices_data
+
+        body = FastJSONResponse({"success": True, "data": data, "error": None}).body
+        # 整体替换，避免并发读到 key/body 不一致
+        _batch_body_cache = {"key": cache_key, "body": body}
+        return Response(content=body, media_type="application/json")
     except Exception as e:
-        return ApiResponse.fail(f"批量查询失败: {str(e)}")
+        return error_response("hopper.realtime_batch", f"批量查询失败: {e}")
 
 
 # ============================================================
 # 2. GET /api/hopper/{device_id}/history - 获取料仓历史数据（InfluxDB）
 # ============================================================
-@router.get("/{device_id}/history")
+@router.get("/{device_id}/history", response_class=FastJSONResponse)
 async def get_hopper_history(
     device_id: str = Path(..., description="设备ID", example="hopper_unit_4"),
     start: Optional[datetime] = Query(None, description="开始时间", example="2026-01-20T00:00:00"),
@@ -74,47 +134,84 @@ async def get_hopper_history(
         example="vibration"
     ),
     fields: Optional[str] = Query(None, description="字段筛选 (逗号分隔)", example="vx,vy,vz"),
-    interval: Optional[str] = Query("5m", description="聚合间隔", example="5m")
+    interval: Optional[str] = Query("5m", description="聚合间隔", example="5m"),
+    stream: bool = Query(False, description="NDJSON 流式输出 (大时间范围，不经过缓存)")
 ):
     """获取料仓历史数据 (按 tag 查询)
 
-    **PM10字段**: pm10_value (ug/m3)
+    **PM10字段**: pm10, pm2_5, pm1_0, concentration (ug/m3)
     **温度字段**: temperature (C)
     **电表字段**: Ua_0, Ua_1, Ua_2 (V), I_0, I_1, I_2 (A), Pt (kW), ImpEp (kWh)
     **振动字段**: vx, vy, vz (mm/s), dx, dy, dz (um), hzx, hzy, hzz (Hz)
+
+    **stream=true**: 返回 application/x-ndjson，第一行为 {device_id, time_range, interval}，
+    之后每行一条数据记录，边查询边发送
     """
     try:
-        if not start:
-            start = datetime.now() - timedelta(hours=1)
-        if not end:
-            end = datetime.now()
-
-        field_list = fields.split(",") if fields else None
+        # 默认窗口: 最近 1 小时 (只取一次当前时间，start/end 对齐同一时刻)
+        # naive 时间按北京时间解释，取北京时间而不是服务器本地时间
+        if not start or not end:
+            now = now_beijing().replace(tzinfo=None)
+            if not start:
+                start = now - timedelta(hours=1)
+            if not end:
+                end = now
+
+        field_list = _parse_fields(fields)
+        if field_list is not None and not field_list:
+            return ApiResponse.fail(f"非法的字段: {fields}")
 
         # 振动数据拆分到 DB6 后，InfluxDB 中 device_id 为 hopper_vib_6
         query_device_id = device_id
         if module_type == "vibration" and device_id == "hopper_unit_4":
             query_device_id = "hopper_vib_6"
 
-        # [FIX] InfluxDB 查询在线程池中执行，避免阻塞事件循环
-        data = await asyncio.to_thread(
-            get_history_service().query_device_history,
-            device_id=query_device_id,
-            start=start,
-            end=end,
-            module_type=module_type,
-            fields=field_list,
-            interval=interval
+        time_range = {"start": start.isoformat(), "end": end.isoformat()}
+
+        if stream:
+            # 在线程池中发出查询 (错误在开始响应前抛出)，之后逐行序列化发送
+            rows = await asyncio.to_thread(
+                get_history_service().iter_device_history,
+                device_id=query_device_id,
+                start=start,
+                end=end,
+                module_type=module_type,
+                fields=field_list,
+                interval=interval
+            )
+
+            def _render_ndjson():
+                yield json_bytes({"device_id": device_id, "time_range": time_range, "interval": interval}) + b"\n"
+                for row in rows:
+                    yield json_bytes(row) + b"\n"
+
+            return StreamingResponse(_render_ndjson(), media_type="application/x-ndjson")
+
+        cache_key = (
+            query_device_id, module_type, tuple(field_list or ()), interval,
+            beijing_to_utc_naive(start), beijing_to_utc_naive(end),
         )
-
-        return ApiResponse.ok({
+        data = _history_cache_get(cache_key)
+        if data is None:
+            # [FIX] InfluxDB 查询在线程池中执行，避免阻塞事件循环
+            data = await asyncio.to_thread(
+                get_history_service().query_device_history,
+                device_id=query_device_id,
+                start=start,
+                end=end,
+                module_type=module_type,
+                fields=field_list,
+                interval=interval
+            )
+            _history_cache_put(cache_key, data)
+
+        # 历史数据可达数千行: 直接交给 FastJSONResponse 序列化，
+        # 跳过 ApiResponse 校验和 jsonable_encoder 对每一行的递归遍历
+        return FastJSONResponse({"success": True, "data": {
             "device_id": device_id,
-            "time_range": {
-                "start": start.isoformat(),
-                "end": end.isoformat()
-            },
+            "time_range": time_range,
             "interval": interval,
             "data": data
-        })
+        }, "error": None})
     except Exception as e:
-        return ApiResponse.fail(f"查询失败: {str(e)}")
+        return error_response("hopper.history", f"查询失败: {e}")
@@ -8,7 +8,9 @@ WebSocket 实时数据推送端点 - 料仓监控系统
     参见 docs/WEBSOCKET_PROTOCOL.md
 """
 
+import json
 import logging
+import time
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
@@ -19,13 +21,34 @@ from app.models.ws_messages import (
     ErrorCode,
     SubscribeMessage,
     UnsubscribeMessage,
-    HeartbeatMessage,
 )
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["WebSocket"])
 
+# 心跳回复缓存: 所有连接共用同一份已序列化文本，最多每 0.5s 刷新一次时间戳
+_HEARTBEAT_REFRESH = 0.5
+_heartbeat_reply = {"text": "", "mono": 0.0}
+
+
+def _get_heartbeat_reply() -> str:
+    """获取心跳回复 (预序列化 JSON 文本)"""
+    now = time.monotonic()
+    if now - _heartbeat_reply["mono"] > _HEARTBEAT_REFRESH:
+        _heartbeat_reply["text"] = json.dumps({
+            "type": "heartbeat",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }, separators=(",", ":"))
+        _heartbeat_reply["mono"] = now
+    return _heartbeat_reply["text"]
+
 
 @router.websocket("/realtime")
 async def websocket_endpoint(websocket: WebSocket):
@@ -50,8 +73,7 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             # 接收客户端消息
             try:
-                data = await websocket.receive_json()
-                logger.debug(f"[WS] 收到消息: {data}")
+                raw = await websocket.receive_text()
             except WebSocketDisconnect:
                 logger.info("[WS] 客户端主动断开连接")
                 break
@@ -64,10 +86,38 @@ async def websocket_endpoint(websocket: WebSocket):
                 })
                 continue
 
+            try:
+                data = _json_loads(raw)
+                if not isinstance(data, dict):
+                    raise ValueError("消息必须是 JSON 对象")
+                logger.debug("[WS] 收到消息: %s", data)
+            except Exception as e:
+                logger.warning(f"[WS] 解析消息失败: {e}")
+                await manager.send_personal(websocket, {
+                    "type": "error",
+                    "code": ErrorCode.INVALID_MESSAGE,
+                    "message": "无效的 JSON 消息格式",
+                })
+                continue
+
             msg_type = data.get("type")
 
+            # 处理心跳 (高频消息，放在最前面；字段检查等价于 HeartbeatMessage)
+            if msg_type == "heartbeat":
+                timestamp = data.get("timestamp")
+                if timestamp is not None and not isinstance(timestamp, str):
+                    await manager.send_personal(websocket, {
+                        "type": "error",
+                        "code": ErrorCode.INVALID_MESSAGE,
+                        "message": "heartbeat 消息格式错误",
+                    })
+                    continue
+
+                manager.update_heartbeat(websocket)
+                await manager.send_personal_text(websocket, _get_heartbeat_reply())
+
             # 处理订阅
-            if msg_type == "subscribe":
+            elif msg_type == "subscribe":
                 try:
                     subscribe_msg = SubscribeMessage.model_validate(data)
                 except ValidationError:
@@ -102,24 +152,6 @@ async def websocket_endpoint(websocket: WebSocket):
                 channel = unsubscribe_msg.channel
                 manager.unsubscribe(websocket, channel)
 
-            # 处理心跳
-            elif msg_type == "heartbeat":
-                try:
-                    HeartbeatMessage.model_validate(data)
-                except ValidationError:
-                    await manager.send_personal(websocket, {
-                        "type": "error",
-                        "code": ErrorCode.INVALID_MESSAGE,
-                        "message": "heartbeat 消息格式错误",
-                    })
-                    continue
-
-                manager.update_heartbeat(websocket)
-                await manager.send_personal(websocket, {
-                    "type": "heartbeat",
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                })
-
             # 未知消息类型
             else:
                 logger.warning(f"[WS] 未知消息类型: {msg_type}")
@@ -6,7 +6,15 @@
 
 import random
 from datetime import datetime, timedelta
-from app.core.influxdb import write_point
+from typing import Any, Dict, List
+from app.core.influxdb import build_point, write_points_batch
+
+
+def _append_point(points: List, measurement: str, tags: Dict[str, str], fields: Dict[str, Any]) -> None:
+    """构建 Point 加入待写列表（所有模拟数据最后一次性批量写入）"""
+    point = build_point(measurement, tags, fields)
+    if point is not None:
+        points.append(point)
 
 
 def seed_mock_data():
@@ -14,26 +22,34 @@ def seed_mock_data():
     print("📊 开始插入模拟数据...")
     
     try:
+        points: List = []
+        
         # 1. 料仓数据 (9个料仓)
-        seed_hopper_data()
+        seed_hopper_data(points)
         
         # 2. 辊道窑数据 (6个温区)
-        seed_roller_kiln_data()
+        seed_roller_kiln_data(points)
         
         # 3. SCR设备数据 (2台)
-        seed_scr_data()
+        seed_scr_data(points)
         
         # 4. 风机数据 (2台)
-        seed_fan_data()
+        seed_fan_data(points)
+        
+        # 5. 一次 HTTP 请求批量写入，替代逐点同步写入
+        success, err = write_points_batch(points)
+        if not success:
+            print(f"❌ 模拟数据插入失败: {err}")
+            return False
         
-        print("✅ 模拟数据插入完成！")
+        print(f"✅ 模拟数据插入完成！共 {len(points)} 个数据点")
         return True
     except Exception as e:
         print(f"❌ 模拟数据插入失败: {str(e)}")
         return False
 
 
-def seed_hopper_data():
+def seed_hopper_data(points: List):
     """插入料仓模拟数据"""
     hoppers = [
         # 短料仓 (4个)
@@ -52,7 +68,8 @@ def seed_hopper_data():
     
     for hopper in hoppers:
         # 电表数据
-        write_point(
+        _append_point(
+            points,
             measurement="sensor_data",
             tags={
                 "device_id": hopper["device_id"],
@@ -74,7 +91,8 @@ def seed_hopper_data():
         )
         
         # 温度数据
-        write_point(
+        _append_point(
+            points,
             measurement="sensor_data",
             tags={
                 "device_id": hopper["device_id"],
@@ -89,7 +107,8 @@ def seed_hopper_data():
         )
         
         # 称重数据
-        write_point(
+        _append_point(
+            points,
             measurement="sensor_data",
             tags={
                 "device_id": hopper["device_id"],
@@ -104,16 +123,17 @@ def seed_hopper_data():
             }
         )
     
-    print(f"  ✓ 插入 {len(hoppers)} 个料仓的模拟数据")
+    print(f"  ✓ 生成 {len(hoppers)} 个料仓的模拟数据")
 
 
-def seed_roller_kiln_data():
+def seed_roller_kiln_data(points: List):
     """插入辊道窑模拟数据"""
     zones = ["zone1", "zone2", "zone3", "zone4", "zone5", "zone6"]
     
     for zone in zones:
         # 电表数据
-        write_point(
+        _append_point(
+            points,
             measurement="sensor_data",
             tags={
                 "device_id": "roller_kiln_1",
@@ -135,7 +155,8 @@ def seed_roller_kiln_data():
         )
         
         # 温度数据
-        write_point(
+        _append_point(
+            points,
             measurement="sensor_data",
             tags={
                 "device_id": "roller_kiln_1",
@@ -149,16 +170,17 @@ def seed_roller_kiln_data():
             }
         )
     
-    print(f"  ✓ 插入辊道窑 {len(zones)} 个温区的模拟数据")
+    print(f"  ✓ 生成辊道窑 {len(zones)} 个温区的模拟数据")
 
 
-def seed_scr_data():
+def seed_scr_data(points: List):
     """插入SCR设备模拟数据"""
     scr_devices = ["scr_1", "scr_2"]
     
     for device_id in scr_devices:
         # 电表数据
-        write_point(
+        _append_point(
+            points,
             measurement="sensor_data",
             tags={
                 "device_id": device_id,
@@ -180,7 +202,8 @@ def seed_scr_data():
         )
         
         # 燃气流量数据
-        write_point(
+        _append_point(
+            points,
             measurement="sensor_data",
             tags={
                 "device_id": device_id,
@@ -195,16 +218,17 @@ def seed_scr_data():
             }
         )
     
-    print(f"  ✓ 插入 {len(scr_devices)} 台SCR设备的模拟数据")
+    print(f"  ✓ 生成 {len(scr_devices)} 台SCR设备的模拟数据")
 
 
-def seed_fan_data():
+def seed_fan_data(points: List):
     """插入风机模拟数据"""
     fan_devices = ["fan_1", "fan_2"]
     
     for device_id in fan_devices:
         # 电表数据
-        write_point(
+        _append_point(
+            points,
             measurement="sensor_data",
             tags={
                 "device_id": device_id,
@@ -225,4 +249,4 @@ def seed_fan_data():
             }
         )
     
-    print(f"  ✓ 插入 {len(fan_devices)} 台风机的模拟数据")
+    print(f"  ✓ 生成 {len(fan_devices)} 台风机的模拟数据")
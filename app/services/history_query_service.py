@@ -5,6 +5,7 @@
 # 1. query_device_list()          - 查询设备列表
 # 2. query_device_realtime()      - 查询设备最新数据
 # 3. query_device_history()       - 查询设备历史数据
+#    iter_device_history()        - 逐行产出设备历史数据 (流式)
 # 4. query_temperature_history()  - 查询温度历史
 # 5. query_power_history()        - 查询功率历史
 # 6. query_weight_history()       - 查询称重历史
@@ -12,42 +13,182 @@
 # 8. query_db_devices()           - 按DB块查询设备
 # ============================================================
 
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from influxdb_client import InfluxDBClient
 from functools import lru_cache
 
 from config import get_settings
-from app.core.influxdb import get_influx_client
-from app.core.timezone_utils import to_beijing, beijing_isoformat, BEIJING_TZ
+from app.core.influxdb import get_influx_client, get_query_api, flux_value, flux_duration, duration_seconds
+from app.core.timezone_utils import to_beijing, beijing_isoformat, beijing_to_utc_naive
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 失败日志限流: InfluxDB 不可用时每个请求都会失败，同一类失败每 60 秒只记录一次
+_WARN_INTERVAL = 60.0
+_last_warn_time: Dict[str, float] = {}
+
+
+def _warn_throttled(key: str, msg: str, *args) -> None:
+    """按 key 限流的 warning 日志"""
+    now = time.monotonic()
+    if now - _last_warn_time.get(key, -_WARN_INTERVAL) >= _WARN_INTERVAL:
+        _last_warn_time[key] = now
+        logger.warning(msg, *args)
 
 
 # 🔧 单例实例
 _history_service_instance: Optional['HistoryQueryService'] = None
 
+# 设备列表 TTL 缓存 {device_type or "": (monotonic_time, device_list)}
+# 设备清单按分钟/小时级变化，无需每次请求都扫描 InfluxDB
+_DEVICE_LIST_TTL = 30.0
+_device_list_cache: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+
+
+# 兜底设备列表 (InfluxDB 无数据或查询失败时返回)，模块加载时构建一次并按设备类型预先分组
+_FALLBACK_DEVICES = (
+    # 短料仓 (4个)
+    {"device_id": "short_hopper_1", "device_type": "short_hopper", "db_number": "8"},
+    {"device_id": "short_hopper_2", "device_type": "short_hopper", "db_number": "8"},
+    {"device_id": "short_hopper_3", "device_type": "short_hopper", "db_number": "8"},
+    {"device_id": "short_hopper_4", "device_type": "short_hopper", "db_number": "8"},
+    # 无料仓 (2个)
+    {"device_id": "no_hopper_1", "device_type": "no_hopper", "db_number": "8"},
+    {"device_id": "no_hopper_2", "device_type": "no_hopper", "db_number": "8"},
+    # 长料仓 (3个)
+    {"device_id": "long_hopper_1", "device_type": "long_hopper", "db_number": "8"},
+    {"device_id": "long_hopper_2", "device_type": "long_hopper", "db_number": "8"},
+    {"device_id": "long_hopper_3", "device_type": "long_hopper", "db_number": "8"},
+    # 辊道窑 (1个)
+    {"device_id": "roller_kiln_1", "device_type": "roller_kiln", "db_number": "9"},
+    # SCR (2个)
+    {"device_id": "scr_1", "device_type": "scr", "db_number": "10"},
+    {"device_id": "scr_2", "device_type": "scr", "db_number": "10"},
+    # 风机 (2个)
+    {"device_id": "fan_1", "device_type": "fan", "db_number": "10"},
+    {"device_id": "fan_2", "device_type": "fan", "db_number": "10"},
+)
+_FALLBACK_DEVICES_BY_TYPE: Dict[str, List[Dict[str, Any]]] = {}
+for _device in _FALLBACK_DEVICES:
+    _FALLBACK_DEVICES_BY_TYPE.setdefault(_device["device_type"], []).append(_device)
+
+
+# pivot 后历史数据行中不作为字段输出的列 (以 _ 开头的系统列另行排除)
+_HISTORY_RESERVED_COLUMNS = frozenset({
+    'device_id', 'device_type', 'module_type', 'module_tag', 'db_number', 'result', 'table'
+})
+
+
+# 实时查询的回溯范围 (由近到远)、各设备上次取全模块的档位 {device_id: 档位下标}
+# 及各设备已知的模块 {device_id: module_tag 集合}
+_REALTIME_LOOKBACKS = ("-5m", "-1h", "-1d", "-30d")
+_realtime_lookback: Dict[str, int] = {}
+_realtime_module_tags: Dict[str, frozenset] = {}
+
+
+# 数据库最新时间戳 TTL 缓存 (monotonic_time, latest_time)
+# 前端把 /health/latest-timestamp 当心跳高频轮询，而数据只在批量写入时才前进
+_LATEST_TS_TTL = 5.0
+_latest_ts_cache: Optional[Tuple[float, Optional[datetime]]] = None
+
+
+# 本进程最近一次成功写入 InfluxDB 的数据 (monotonic_time, 数据时间 UTC)，由轮询写入路径更新
+# 刚写入、且比缓存的数据库值更新时直接返回，省去一次查询；其他情况仍以数据库为准
+# (其他进程写入、数据被删除或过期都只能从数据库查到)
+_latest_written: Optional[Tuple[float, datetime]] = None
+
+
+def note_db_write(latest_time: datetime) -> None:
+    """记录一批数据写入成功（传入该批最新的 UTC 时间，补写的旧数据不会让时间回退）"""
+    global _latest_written
+    written = _latest_written
+    if written is None or latest_time >= written[1]:
+        _latest_written = (time.monotonic(), latest_time)
+
+
+def invalidate_device_list_cache() -> None:
+    """清空设备列表缓存（轮询服务发现新设备时调用）"""
+    _device_list_cache.clear()
+
+
+# 拆分查询 (多设备对比 / 长时间范围分段) 的并发线程池
+# 按需创建，进程内复用；线程数不超过 InfluxDB 连接池大小。提交的任务内不得再向本池提交任务
+_QUERY_MAX_WORKERS = 8
+_query_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_query_executor() -> ThreadPoolExecutor:
+    global _query_executor
+    if _query_executor is None:
+        _query_executor = ThreadPoolExecutor(
+            max_workers=_QUERY_MAX_WORKERS, thread_name_prefix="influx-query"
+        )
+    return _query_executor
+
+
+# 长时间范围历史查询按时间分段并发: 每段至少 1 天且至少 1000 个聚合窗口，段数约为 _QUERY_MAX_WORKERS
+_SPLIT_MIN_SPAN = 86400
+_SPLIT_MIN_BUCKETS = 1000
+
+
+def _split_time_range(start_utc: datetime, end_utc: datetime, interval: str) -> List[Tuple[datetime, datetime]]:
+    """把 [start, end) 拆成若干段，分段点对齐聚合间隔 (与 aggregateWindow 的窗口边界一致，窗口不会被切开)
+
+    范围不够长或间隔不是简单时长时返回原范围一段
+    """
+    step = duration_seconds(interval)
+    span = (end_utc - start_utc).total_seconds()
+    if step is None:
+        return [(start_utc, end_utc)]
+    chunk = max(_SPLIT_MIN_SPAN, step * _SPLIT_MIN_BUCKETS, span / _QUERY_MAX_WORKERS)
+    chunk = -(-int(chunk) // step) * step
+    if span <= chunk * 2:
+        return [(start_utc, end_utc)]
+
+    epoch = datetime(1970, 1, 1)
+    ranges = []
+    seg_start = start_utc
+    # 第一个分段点: start 之后第一个 chunk 对齐的窗口边界
+    boundary = int((start_utc - epoch).total_seconds()) // chunk * chunk + chunk
+    while seg_start < end_utc:
+        seg_end = min(epoch + timedelta(seconds=boundary), end_utc)
+        ranges.append((seg_start, seg_end))
+        seg_start = seg_end
+        boundary += chunk
+    return ranges
+
 
 class HistoryQueryService:
     """历史数据查询服务（单例模式）"""
     
     def __init__(self):
-        self._client = None  # 🔧 延迟初始化
-        self._query_api = None
         self.bucket = settings.influx_bucket
+        # 不含请求参数的 Flux 查询只拼接一次
+        # 各序列 last() 后合并为一张表，由服务端 max() 归约出唯一一行
+        self._latest_ts_query = f'''
+        from(bucket: "{self.bucket}")
+            |> range(start: -30d)
+            |> filter(fn: (r) => r["_measurement"] == "sensor_data")
+            |> last()
+            |> group()
+            |> max(column: "_time")
+            |> keep(columns: ["_time"])
+        '''
     
     @property
-    def client(self):
-        """延迟获取 InfluxDB 客户端"""
-        if self._client is None:
-            self._client = get_influx_client()
-        return self._client
+    def client(self) -> InfluxDBClient:
+        """获取进程内共享的 InfluxDB 客户端（不在实例上持有，close_influx_client() 后自动取到新 client）"""
+        return get_influx_client()
     
     @property
     def query_api(self):
-        """延迟获取 query_api，确保使用最新的 client"""
-        # 🔧 每次都从当前 client 获取，避免旧 client 过期
-        return self.client.query_api()
+        """获取 query_api 单例（客户端重建时随之重置，不会引用过期 client）"""
+        return get_query_api()
     
     # ------------------------------------------------------------
     # 0. get_latest_db_timestamp() - 获取数据库中最新数据的时间戳
@@ -58,27 +199,29 @@ class HistoryQueryService:
         Returns:
             最新数据的时间戳（UTC时间），如果没有数据则返回None
         """
-        query = f'''
-        from(bucket: "{self.bucket}")
-            |> range(start: -30d)
-            |> filter(fn: (r) => r["_measurement"] == "sensor_data")
-            |> last()
-            |> keep(columns: ["_time"])
-        '''
-        
+        global _latest_ts_cache
+        now = time.monotonic()
+        cached = _latest_ts_cache
+        written = _latest_written
+        if (
+            written is not None and now - written[0] < _LATEST_TS_TTL
+            and (cached is None or cached[1] is None or written[1] > cached[1])
+        ):
+            return written[1]
+
+        if cached is not None and now - cached[0] < _LATEST_TS_TTL:
+            return cached[1]
+
         try:
-            result = self.query_api.query(query)
-            latest_time = None
-            
-            for table in result:
-                for record in table.records:
-                    timestamp = record.get_time()
-                    if latest_time is None or timestamp > latest_time:
-                        latest_time = timestamp
+            records = self.query_api.query_stream(self._latest_ts_query)
+            record = next(records, None)
+            latest_time = record.get_time() if record is not None else None
             
+            # 只缓存成功的查询结果（失败不缓存，InfluxDB 恢复后立即可查）
+            _latest_ts_cache = (time.monotonic(), latest_time)
             return latest_time
         except Exception as e:
-            print(f"⚠️  获取最新时间戳失败: {str(e)}")
+            _warn_throttled("latest_db_timestamp", "获取最新时间戳失败: %s", e)
             return None
     
     # ------------------------------------------------------------
@@ -96,35 +239,33 @@ class HistoryQueryService:
             查询到的重量值，如果没有则返回None
         """
         # 计算查询时间范围 [target - window, target + window]
-        start_time = target_time - timedelta(seconds=window_seconds)
-        end_time = target_time + timedelta(seconds=window_seconds)
+        # naive 时间视为北京时间并转换为 UTC (Flux range 不接受无时区的时间字符串)
+        target_utc = beijing_to_utc_naive(target_time)
+        start_time = target_utc - timedelta(seconds=window_seconds)
+        end_time = target_utc + timedelta(seconds=window_seconds)
         
         query = f'''
         from(bucket: "{self.bucket}")
-            |> range(start: {start_time.isoformat()}, stop: {end_time.isoformat()})
+            |> range(start: {start_time.isoformat()}Z, stop: {end_time.isoformat()}Z)
             |> filter(fn: (r) => r["_measurement"] == "sensor_data")
-            |> filter(fn: (r) => r["device_id"] == "{device_id}")
+            |> filter(fn: (r) => r["device_id"] == "{flux_value(device_id)}")
             |> filter(fn: (r) => r["_field"] == "weight")
             |> filter(fn: (r) => r["module_type"] == "WeighSensor")
             |> first()
-            |> yield(name: "weight")
+            |> keep(columns: ["_value"])
         '''
         
         try:
-            result = self.query_api.query(query)
-            
-            # 解析结果
-            for table in result:
-                for record in table.records:
-                    # 返回第一个匹配的值
-                    val = record.get_value()
-                    if val is not None:
-                        return float(val)
+            # 只返回 _value 一列，取到第一个非空值即停止读取剩余响应
+            for record in self.query_api.query_stream(query):
+                val = record.get_value()
+                if val is not None:
+                    return float(val)
             
             return None
         except Exception as e:
-            # 静默失败，避免刷屏日志
-            # print(f"⚠️  查询历史重量失败: {str(e)}")
+            # 限流记录，避免 InfluxDB 不可用时刷屏
+            _warn_throttled("weight_at_timestamp", "查询历史重量失败: %s", e)
             return None
 
     # ------------------------------------------------------------
@@ -142,75 +283,60 @@ class HistoryQueryService:
                 ...
             ]
         """
+        # 命中 TTL 缓存直接返回副本
+        cache_key = device_type or ""
+        cached = _device_list_cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < _DEVICE_LIST_TTL:
+            return list(cached[1])
+        
         # 使用更简单的查询方式，避免 distinct 类型冲突
         # 修复: 保留 _value 列，避免 "no column _value exists" 错误
+        # range |> filter |> group |> first 可整体下推到存储层 (每组只读一个点)，
+        # keep() 放在 first() 之后，放在前面会阻止下推、退化为扫描 24 小时全部数据
         filter_str = 'r["_measurement"] == "sensor_data"'
         if device_type:
-            filter_str += f' and r["device_type"] == "{device_type}"'
+            filter_str += f' and r["device_type"] == "{flux_value(device_type)}"'
         
         query = f'''
         from(bucket: "{self.bucket}")
             |> range(start: -24h)
             |> filter(fn: (r) => {filter_str})
-            |> keep(columns: ["device_id", "device_type", "db_number", "_value", "_time"])
             |> group(columns: ["device_id", "device_type", "db_number"])
             |> first()
+            |> keep(columns: ["device_id", "device_type", "db_number", "_value", "_time"])
         '''
         
         try:
-            result = self.query_api.query(query)
+            records = self.query_api.query_stream(query)
             
             devices = {}
-            for table in result:
-                for record in table.records:
-                    device_id = record.values.get('device_id')
-                    if device_id and device_id not in devices:
-                        devices[device_id] = {
-                            'device_id': device_id,
-                            'device_type': record.values.get('device_type', ''),
-                            'db_number': record.values.get('db_number', '')
-                        }
+            for record in records:
+                device_id = record.values.get('device_id')
+                if device_id and device_id not in devices:
+                    devices[device_id] = {
+                        'device_id': device_id,
+                        'device_type': record.values.get('device_type', ''),
+                        'db_number': record.values.get('db_number', '')
+                    }
             
             device_list = list(devices.values())
             
-            # 如果数据库没有数据，返回兜底的设备列表
+            # 如果数据库没有数据，返回兜底的设备列表 (兜底结果不缓存，数据写入后可立即查到)
             if not device_list:
-                device_list = self._get_fallback_device_list(device_type)
+                return self._get_fallback_device_list(device_type)
             
-            return device_list
+            _device_list_cache[cache_key] = (time.monotonic(), device_list)
+            return list(device_list)
         except Exception as e:
             # 查询失败时，返回兜底列表
-            print(f"⚠️  设备列表查询失败: {str(e)}，返回兜底数据")
+            _warn_throttled("device_list", "设备列表查询失败: %s，返回兜底数据", e)
             return self._get_fallback_device_list(device_type)
     
     def _get_fallback_device_list(self, device_type: Optional[str] = None) -> List[Dict[str, Any]]:
         """返回兜底的设备列表，确保永远不为空"""
-        all_devices = [
-            # 短料仓 (4个)
-            {"device_id": "short_hopper_1", "device_type": "short_hopper", "db_number": "8"},
-            {"device_id": "short_hopper_2", "device_type": "short_hopper", "db_number": "8"},
-            {"device_id": "short_hopper_3", "device_type": "short_hopper", "db_number": "8"},
-            {"device_id": "short_hopper_4", "device_type": "short_hopper", "db_number": "8"},
-            # 无料仓 (2个)
-            {"device_id": "no_hopper_1", "device_type": "no_hopper", "db_number": "8"},
-            {"device_id": "no_hopper_2", "device_type": "no_hopper", "db_number": "8"},
-            # 长料仓 (3个)
-            {"device_id": "long_hopper_1", "device_type": "long_hopper", "db_number": "8"},
-            {"device_id": "long_hopper_2", "device_type": "long_hopper", "db_number": "8"},
-            {"device_id": "long_hopper_3", "device_type": "long_hopper", "db_number": "8"},
-            # 辊道窑 (1个)
-            {"device_id": "roller_kiln_1", "device_type": "roller_kiln", "db_number": "9"},
-            # SCR (2个)
-            {"device_id": "scr_1", "device_type": "scr", "db_number": "10"},
-            {"device_id": "scr_2", "device_type": "scr", "db_number": "10"},
-            # 风机 (2个)
-            {"device_id": "fan_1", "device_type": "fan", "db_number": "10"},
-            {"device_id": "fan_2", "device_type": "fan", "db_number": "10"},
-        ]
-        
         if device_type:
-            return [d for d in all_devices if d["device_type"] == device_type]
-        return all_devices
+            return list(_FALLBACK_DEVICES_BY_TYPE.get(device_type, ()))
+        return list(_FALLBACK_DEVICES)
     
     # ------------------------------------------------------------
     # 2. query_device_realtime() - 查询设备最新数据
@@ -233,46 +359,94 @@ class HistoryQueryService:
             }
         
         说明:
-            - 查询数据库中的最新数据，不限时间范围
-            - 使用 -30d 范围确保能找到数据（但只取最新的一条）
+            - 查询数据库中的最新数据，每个模块取 30 天内的最后一个值
+            - 回溯范围由 -5m 逐级放大到 -30d: 已知的模块全部取到即停止，
+              仍缺的模块 (如停止上报的模块) 只对这些 module_tag 继续放大范围
         """
-        # 查询最近30天的最新数据（确保能找到数据，但只取最新）
-        query = f'''
-        from(bucket: "{self.bucket}")
-            |> range(start: -30d)
-            |> filter(fn: (r) => r["device_id"] == "{device_id}")
-            |> last()
-        '''
-        
-        result = self.query_api.query(query)
-        
-        # 解析结果，按module_tag分组
-        modules_data = {}
-        latest_time = None
+        # 解析结果，按 module_tag 分组
+        devices: Dict[str, Dict[str, Any]] = {}
+        latest_times: Dict[str, datetime] = {}
+        
+        # 由近到远逐级放大回溯范围: 正常上报的模块在最近几分钟内就能取到 last()，
+        # 避免每次都扫描 30 天数据；首次查询 (尚不知道设备有哪些模块) 直接取 30 天
+        # 起始档位取上次命中档位的前一档，设备恢复上报后范围能逐步收窄
+        last_level = len(_REALTIME_LOOKBACKS) - 1
+        known_tags = _realtime_module_tags.get(device_id)
+        if known_tags is None:
+            first_level = last_level
+        else:
+            first_level = max(_realtime_lookback.get(device_id, 0) - 1, 0)
+        
+        missing_tags: Optional[frozenset] = None
+        hit_level = last_level
+        for level in range(first_level, len(_REALTIME_LOOKBACKS)):
+            filters = [
+                'r["_measurement"] == "sensor_data"',
+                f'r["device_id"] == "{flux_value(device_id)}"',
+            ]
+            if missing_tags:
+                filters.append(' or '.join(f'r["module_tag"] == "{flux_value(t)}"' for t in sorted(missing_tags)))
+            filter_str = '\n                '.join(f'|> filter(fn: (r) => {f})' for f in filters)
+            
+            query = f'''
+            from(bucket: "{self.bucket}")
+                |> range(start: {_REALTIME_LOOKBACKS[level]})
+                {filter_str}
+                |> last()
+            '''
+            
+            self._collect_realtime_records(self.query_api.query_stream(query), devices, latest_times)
+            found_tags = devices.get(device_id, {}).get('modules', {}).keys()
+            if found_tags and known_tags is not None:
+                missing_tags = known_tags.difference(found_tags)
+                if not missing_tags:
+                    hit_level = level
+                    break
+        
+        # 完整探测后 30 天内都取不到的模块不再继续追踪；整台设备没有数据时下次重新完整探测
+        _realtime_lookback[device_id] = hit_level
+        if device_id not in devices:
+            _realtime_module_tags.pop(device_id, None)
+            return {
+                'device_id': device_id,
+                'timestamp': None,
+                'modules': {}
+            }
         
-        for table in result:
-            for record in table.records:
-                module_tag = record.values.get('module_tag', 'unknown')
-                field_name = record.get_field()
-                field_value = record.get_value()
-                timestamp = record.get_time()
+        device = devices[device_id]
+        _realtime_module_tags[device_id] = frozenset(device['modules'])
+        device['timestamp'] = to_beijing(latest_times[device_id]).isoformat()
+        return device
+    
+    @staticmethod
+    def _collect_realtime_records(
+        records,
+        devices: Dict[str, Dict[str, Any]],
+        latest_times: Dict[str, datetime]
+    ) -> None:
+        """把 last() 返回的 FluxRecord 按 device_id -> module_tag 归入 devices，并记录各设备最新时间"""
+        for record in records:
+            device_id = record.values.get('device_id')
+            module_tag = record.values.get('module_tag', 'unknown')
+            timestamp = record.get_time()
                 
-                if module_tag not in modules_data:
-                    modules_data[module_tag] = {
-                        'module_type': record.values.get('module_type', ''),
-                        'fields': {}
-                    }
+            device = devices.get(device_id)
+            if device is None:
+                device = devices[device_id] = {'device_id': device_id, 'timestamp': None, 'modules': {}}
                 
-                modules_data[module_tag]['fields'][field_name] = field_value
+            # 与设备同样用 get() 取已有模块，命中时只做一次哈希查找
+            module = device['modules'].get(module_tag)
+            if module is None:
+                module = device['modules'][module_tag] = {
+                    'module_type': record.values.get('module_type', ''),
+                    'fields': {}
+                }
                 
-                if latest_time is None or timestamp > latest_time:
-                    latest_time = timestamp
-        
-        return {
-            'device_id': device_id,
-            'timestamp': to_beijing(latest_time).isoformat() if latest_time else None,
-            'modules': modules_data
-        }
+            module['fields'][record.get_field()] = record.get_value()
+                
+            latest_time = latest_times.get(device_id)
+            if latest_time is None or timestamp > latest_time:
+                latest_times[device_id] = timestamp
     
     # ------------------------------------------------------------
     # 2. query_device_history() - 查询设备历史数据
@@ -309,61 +483,104 @@ class HistoryQueryService:
                 ...
             ]
         """
-        # 构建过滤条件
-        filters = [f'r["device_id"] == "{device_id}"']
+        query_args = dict(
+            device_id=device_id,
+            module_type=module_type,
+            module_tag=module_tag,
+            fields=fields,
+            interval=interval
+        )
+        # 时间范围很长时按时间分段并发查询 (单个大查询会长时间占住 InfluxDB)，再按原顺序拼接
+        ranges = _split_time_range(beijing_to_utc_naive(start), beijing_to_utc_naive(end), interval)
+        if len(ranges) == 1:
+            return list(self.iter_device_history(start=start, end=end, **query_args))
+        
+        parts = _get_query_executor().map(
+            lambda r: list(self.iter_device_history(
+                start=r[0].replace(tzinfo=timezone.utc), end=r[1].replace(tzinfo=timezone.utc), **query_args
+            )),
+            ranges
+        )
+        rows = [row for part in parts for row in part]
+        # 单次查询的结果按模块 (Flux 表) 分组、组内按时间升序；分段结果稳定排序后恢复同样的顺序
+        rows.sort(key=lambda row: (row['module_tag'], row['module_type']))
+        return rows
+    
+    # ------------------------------------------------------------
+    # 2.2 iter_device_history() - 逐行产出设备历史数据
+    # ------------------------------------------------------------
+    def iter_device_history(
+        self,
+        device_id: str,
+        start: datetime,
+        end: datetime,
+        module_type: Optional[str] = None,
+        module_tag: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        interval: str = "1m"
+    ) -> Iterator[Dict[str, Any]]:
+        """查询设备历史数据 (逐行产出，不在内存中缓冲完整结果)
+        
+        参数与返回行格式同 query_device_history()。
+        """
+        # 构建过滤条件: 按 measurement -> device_id -> module_type -> module_tag -> _field 顺序，
+        # 全部为正向精确匹配，可下推到存储层；keep() 放在 aggregateWindow 之后，
+        # 放在前面会阻止窗口聚合下推
+        filters = [
+            'r["_measurement"] == "sensor_data"',
+            f'r["device_id"] == "{flux_value(device_id)}"',
+        ]
         
         if module_type:
-            filters.append(f'r["module_type"] == "{module_type}"')
+            filters.append(f'r["module_type"] == "{flux_value(module_type)}"')
         
         if module_tag:
-            filters.append(f'r["module_tag"] == "{module_tag}"')
+            filters.append(f'r["module_tag"] == "{flux_value(module_tag)}"')
         
         if fields:
-            field_conditions = ' or '.join([f'r["_field"] == "{f}"' for f in fields])
-            filters.append(f'({field_conditions})')
+            filters.append(' or '.join([f'r["_field"] == "{flux_value(f)}"' for f in fields]))
         
-        filter_str = ' and '.join(filters)
-        
-        # 🔧 修复时区转换逻辑：检查输入时间是否已有时区信息
-        def to_utc(dt: datetime) -> datetime:
-            if dt.tzinfo is None:
-                # 无时区信息，默认视为北京时间
-                dt = dt.replace(tzinfo=BEIJING_TZ)
-            
-            # 转换为UTC
-            return dt.astimezone(timezone.utc).replace(tzinfo=None)
+        filter_str = '\n            '.join(f'|> filter(fn: (r) => {f})' for f in filters)
         
-        start_utc = to_utc(start)
-        end_utc = to_utc(end)
+        # 🔧 无时区信息的输入视为北京时间，转换为 UTC
+        start_utc = beijing_to_utc_naive(start)
+        end_utc = beijing_to_utc_naive(end)
         
         query = f'''
         from(bucket: "{self.bucket}")
             |> range(start: {start_utc.isoformat()}Z, stop: {end_utc.isoformat()}Z)
-            |> filter(fn: (r) => {filter_str})
-            |> aggregateWindow(every: {interval}, fn: mean, createEmpty: false)
+            {filter_str}
+            |> aggregateWindow(every: {flux_duration(interval)}, fn: mean, createEmpty: false)
+            |> keep(columns: ["_time", "_value", "_field", "module_tag", "module_type"])
             |> pivot(rowKey:["_time"], columnKey: ["_field"], valueColumn: "_value")
         '''
         
-        result = self.query_api.query(query)
-        
-        # 解析结果
-        data = []
-        for table in result:
-            for record in table.records:
-                row = {
-                    'time': to_beijing(record.get_time()).isoformat(),
-                    'module_tag': record.values.get('module_tag', ''),
-                    'module_type': record.values.get('module_type', '')
-                }
-                
-                # 添加所有字段值
-                for key, value in record.values.items():
-                    if not key.startswith('_') and key not in ['device_id', 'device_type', 'module_type', 'module_tag', 'db_number', 'result', 'table']:
-                        row[key] = value
-                
-                data.append(row)
-        
-        return data
+        # query_stream 在调用时即发出请求 (参数/连接错误在这里抛出)，结果按记录逐条解析
+        records = self.query_api.query_stream(query)
+        return self._iter_history_rows(records)
+    
+    @staticmethod
+    def _iter_history_rows(records) -> Iterator[Dict[str, Any]]:
+        """逐条把 pivot 后的 FluxRecord 转换为历史数据行"""
+        # 每个 module_tag 是一张表，各表的聚合窗口时间相同: 同一时间点只做一次时区转换和格式化
+        time_strs: Dict[datetime, str] = {}
+        for record in records:
+            timestamp = record.get_time()
+            time_str = time_strs.get(timestamp)
+            if time_str is None:
+                time_str = time_strs[timestamp] = to_beijing(timestamp).isoformat()
+            row = {
+                'time': time_str,
+                'module_tag': record.values.get('module_tag', ''),
+                'module_type': record.values.get('module_type', '')
+            }
+            
+            # 添加所有字段值
+            for key, value in record.values.items():
+                if key[:1] != '_' and key not in _HISTORY_RESERVED_COLUMNS:
+                    row[key] = value
+            
+            yield row
     
     # ------------------------------------------------------------
     # 3. query_temperature_history() - 查询温度历史
@@ -430,39 +647,34 @@ class HistoryQueryService:
         Returns:
             [{ "time": "...", "added_weight": 10.5, "device_id": "..." }, ...]
         """
-        # 统一时区处理逻辑 (参考 query_device_history)
-        def to_utc(dt: datetime) -> datetime:
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=BEIJING_TZ)
-            return dt.astimezone(timezone.utc).replace(tzinfo=None)
-        
-        start_utc = to_utc(start)
-        end_utc = to_utc(end)
+        # 统一时区处理逻辑 (与 query_device_history 相同)
+        start_utc = beijing_to_utc_naive(start)
+        end_utc = beijing_to_utc_naive(end)
 
         # 构造 Flux 查询 (倒序取最新)
         query = f'''
         from(bucket: "{self.bucket}")
             |> range(start: {start_utc.isoformat()}Z, stop: {end_utc.isoformat()}Z)
             |> filter(fn: (r) => r["_measurement"] == "feeding_records")
-            |> filter(fn: (r) => r["device_id"] == "{device_id}")
+            |> filter(fn: (r) => r["device_id"] == "{flux_value(device_id)}")
             |> filter(fn: (r) => r["_field"] == "added_weight")
             |> sort(columns: ["_time"], desc: true)
             |> limit(n: {limit})
+            |> keep(columns: ["_time", "_value"])
         '''
-        
-        result = self.query_api.query(query)
+        stream = self.query_api.query_stream(query)
         records = []
-        for table in result:
-            for record in table.records:
-                records.append({
-                    "time": to_beijing(record.get_time()).isoformat(), # 转回北京时间方便前端
-                    "added_weight": record.get_value(),
-                    "device_id": device_id
-                })
+        for record in stream:
+            records.append({
+                "time": to_beijing(record.get_time()).isoformat(), # 转回北京时间方便前端
+                "added_weight": record.get_value(),
+                "device_id": device_id
+            })
         
         # [CRITICAL] 按时间升序排列 (Oldest -> Newest)
         # 前端绘制曲线时需要时间按照顺序，否则会出现回勾
-        records.sort(key=lambda x: x["time"])
+        # 查询已按 device_id + _field 限定为单个序列且服务端倒序返回，直接反转即可
+        records.reverse()
         
         return records
     
@@ -520,51 +732,65 @@ class HistoryQueryService:
                 },
                 ...
             ]
-        """
-        # 构建设备过滤条件
-        device_conditions = ' or '.join([f'r["device_id"] == "{did}"' for did in device_ids])
-        
-        filters = [f'({device_conditions})', f'r["_field"] == "{field}"']
         
+        说明:
+            - 设备有多个模块带该字段时 (如多个温度模块)，每个时间点取各模块窗口均值的平均
+        """
+        # 🔧 无时区信息的输入视为北京时间 (因为前端通常传北京时间)，转换为 UTC
+        start_utc = beijing_to_utc_naive(start)
+        end_utc = beijing_to_utc_naive(end)
+        
+        # 每个设备单独查询并发执行 (大 OR 过滤 + 服务端 pivot 在设备多、跨度长时很慢)，
+        # 结果在本地按时间合并为每行一个时间点、每个设备一列
+        args = (field, start_utc, end_utc, module_type, interval)
+        if len(device_ids) > 1:
+            series_list = list(_get_query_executor().map(
+                lambda did: self._query_single_device_field(did, *args), device_ids
+            ))
+        else:
+            series_list = [self._query_single_device_field(did, *args) for did in device_ids]
+        
+        rows: Dict[datetime, Dict[str, Any]] = {}
+        for did, series in zip(device_ids, series_list):
+            for timestamp, value in series:
+                row = rows.get(timestamp)
+                if row is None:
+                    row = rows[timestamp] = {'time': to_beijing(timestamp).isoformat()}
+                row[did] = value
+        
+        return [rows[timestamp] for timestamp in sorted(rows)]
+    
+    def _query_single_device_field(
+        self,
+        device_id: str,
+        field: str,
+        start_utc: datetime,
+        end_utc: datetime,
+        module_type: Optional[str],
+        interval: str
+    ) -> List[Tuple[datetime, Any]]:
+        """查询单个设备单个字段的聚合序列 [(UTC时间, 值), ...]，多个模块的同一字段按时间取平均"""
+        filters = [
+            'r["_measurement"] == "sensor_data"',
+            f'r["device_id"] == "{flux_value(device_id)}"',
+            f'r["_field"] == "{flux_value(field)}"',
+        ]
         if module_type:
-            filters.append(f'r["module_type"] == "{module_type}"')
+            filters.append(f'r["module_type"] == "{flux_value(module_type)}"')
         
         filter_str = ' and '.join(filters)
         
-        # 🔧 修复时区转换逻辑：检查输入时间是否已有时区信息
-        # 如果无时区信息，默认视为北京时间 (因为前端通常传北京时间)
-        if start.tzinfo is None:
-            start = start.replace(tzinfo=BEIJING_TZ)
-        start_utc = start.astimezone(timezone.utc).replace(tzinfo=None)
-
-        if end.tzinfo is None:
-            end = end.replace(tzinfo=BEIJING_TZ)
-        end_utc = end.astimezone(timezone.utc).replace(tzinfo=None)
-        
         query = f'''
         from(bucket: "{self.bucket}")
             |> range(start: {start_utc.isoformat()}Z, stop: {end_utc.isoformat()}Z)
             |> filter(fn: (r) => {filter_str})
-            |> aggregateWindow(every: {interval}, fn: mean, createEmpty: false)
-            |> pivot(rowKey:["_time"], columnKey: ["device_id"], valueColumn: "_value")
+            |> aggregateWindow(every: {flux_duration(interval)}, fn: mean, createEmpty: false)
+            |> group(columns: ["_time"])
+            |> mean()
+            |> group()
+            |> sort(columns: ["_time"])
         '''
-        
-        result = self.query_api.query(query)
-        
-        # 解析结果
-        data = []
-        for table in result:
-            for record in table.records:
-                row = {'time': to_beijing(record.get_time()).isoformat()}
-                
-                # 添加每个设备的值
-                for key, value in record.values.items():
-                    if key in device_ids:
-                        row[key] = value
-                
-                data.append(row)
-        
-        return data
+        return [(record.get_time(), record.get_value()) for record in self.query_api.query_stream(query)]
     
     # ------------------------------------------------------------
     # 8. query_db_devices() - 按DB块查询设备
@@ -578,26 +804,28 @@ class HistoryQueryService:
         Returns:
             设备列表
         """
+        # 与 query_device_list 相同: group |> first 下推到存储层，每个设备只读一个点
+        # (distinct 需要先读出 24 小时内全部数据点再去重)
         query = f'''
         from(bucket: "{self.bucket}")
             |> range(start: -24h)
-            |> filter(fn: (r) => r["db_number"] == "{db_number}")
+            |> filter(fn: (r) => r["_measurement"] == "sensor_data")
+            |> filter(fn: (r) => r["db_number"] == "{flux_value(db_number)}")
             |> group(columns: ["device_id", "device_type"])
-            |> distinct(column: "device_id")
+            |> first()
+            |> keep(columns: ["device_id", "device_type", "_value", "_time"])
         '''
-        
-        result = self.query_api.query(query)
+        records = self.query_api.query_stream(query)
         
         devices = {}
-        for table in result:
-            for record in table.records:
-                device_id = record.values.get('device_id')
-                if device_id and device_id not in devices:
-                    devices[device_id] = {
-                        'device_id': device_id,
-                        'device_type': record.values.get('device_type', ''),
-                        'db_number': db_number
-                    }
+        for record in records:
+            device_id = record.values.get('device_id')
+            if device_id and device_id not in devices:
+                devices[device_id] = {
+                    'device_id': device_id,
+                    'device_type': record.values.get('device_type', ''),
+                    'db_number': db_number
+                }
         
         return list(devices.values())
 
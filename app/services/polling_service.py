@@ -12,24 +12,29 @@
 """
 
 import asyncio
+import concurrent.futures
+import logging
 import yaml
 import threading
+import time
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Tuple, Union
 from collections import deque
 
 from config import get_settings, get_config_path
-from app.core.timezone_utils import now_beijing, beijing_isoformat
-from app.core.influxdb import build_point, write_points_batch, check_influx_health
+from app.core.timezone_utils import now_beijing, beijing_isoformat, parse_iso_datetime
+from app.core.influxdb import build_point, write_points_batch, check_influx_health, timestamp_ns
 from app.core.local_cache import get_local_cache, CachedPoint
 from app.plc.plc_manager import get_plc_manager
 from app.plc.parser_hopper_4 import Hopper4Parser
 from app.plc.parser_vib_db6 import VibDB6Parser
 from app.tools import get_converter, CONVERTER_MAP
 from app.services.alarm_checker import check_device_alarm
+from app.services.history_query_service import invalidate_device_list_cache, note_db_write
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 # 轮询任务句柄
 _polling_task: Optional[asyncio.Task] = None
@@ -43,12 +48,21 @@ _parsers: Dict[int, Any] = {}
 
 # DB映射配置
 _db_mappings: List[Dict[str, Any]] = []
+# 启用的DB块 [(db_number, total_size), ...]，start_polling 时解析一次
+_db_configs: List[Tuple[int, int]] = []
+
+# db_mappings.yaml 解析缓存 (按文件 mtime 失效)
+# 优先使用 libyaml 的 C 解析器，未编译 libyaml 时回退纯 Python 版本
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+_mappings_cache: Dict[str, Any] = {"mtime": 0.0, "config": {}, "by_db": {}}
 
 # ============================================================
 # 内存缓存 (供 WebSocket 推送和 API 读取)
 # ============================================================
 _data_lock = threading.Lock()
 _latest_data: Dict[str, Any] = {}  # {device_id: device_data}
+# 按设备类型分组的二级索引，与 _latest_data 在同一把锁内同步更新（按类型查询不再扫描全部缓存）
+_latest_by_type: Dict[str, Dict[str, Any]] = {}  # {device_type: {device_id: device_data}}
 _latest_timestamp: Optional[datetime] = None
 
 # 数据更新事件 (通知 WS 推送)
@@ -73,6 +87,13 @@ _poll_interval = settings.plc_poll_interval
 # 后台写入任务控制
 _write_queue: Optional[asyncio.Queue] = None
 _write_in_progress = False
+# 队列未就绪时的降级写入线程 (单线程复用，保证降级写入按顺序执行)
+_fallback_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+# InfluxDB 健康探测结果缓存 (monotonic_time, healthy, msg)
+# 每批写入前不再都做一次 /health 往返；写入失败时立即失效，下一批重新探测
+_INFLUX_HEALTH_TTL = 15.0
+_influx_health: Tuple[float, bool, str] = (float("-inf"), False, "")
 
 # ============================================================
 # 统计信息
@@ -117,8 +138,7 @@ def _load_db_mappings() -> List[Tuple[int, int]]:
         return [(4, 144)]
     
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+        config = _read_db_mappings_cached(config_path)
         
         _db_mappings = config.get('db_mappings', [])
 
@@ -153,7 +173,7 @@ def _load_db_mappings() -> List[Tuple[int, int]]:
         
         print(f"[轮询] 加载DB映射配置: {len(enabled_configs)}个DB块")
         for db_num, size in enabled_configs:
-            mapping = next(m for m in _db_mappings if m['db_number'] == db_num)
+            mapping = get_db_mapping(db_num)
             print(f"   - DB{db_num}: {mapping['db_name']} ({size}字节)")
         
         return enabled_configs
@@ -166,6 +186,34 @@ def _load_db_mappings() -> List[Tuple[int, int]]:
         return [(4, 144)]
 
 
+def _read_db_mappings_cached(config_path: Path) -> Dict[str, Any]:
+    """读取 db_mappings.yaml (mtime 未变化时直接返回缓存)
+    
+    同时建立 {db_number: mapping} 索引，按 DB 号查找为一次字典访问。
+    缓存整体替换而非原地修改，并发读取方不会看到半更新状态。
+    """
+    global _mappings_cache
+    
+    mtime = config_path.stat().st_mtime
+    if mtime == _mappings_cache["mtime"]:
+        return _mappings_cache["config"]
+    
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = yaml.load(f, Loader=_YAML_LOADER) or {}
+    
+    _mappings_cache = {
+        "mtime": mtime,
+        "config": config,
+        "by_db": {m['db_number']: m for m in config.get('db_mappings', [])},
+    }
+    return config
+
+
+def get_db_mapping(db_number: int) -> Optional[Dict[str, Any]]:
+    """按 DB 号获取 db_mappings.yaml 中的映射配置"""
+    return _mappings_cache["by_db"].get(db_number)
+
+
 # ------------------------------------------------------------
 # 2. _init_parsers() - 初始化解析器（动态）
 # ------------------------------------------------------------
@@ -199,7 +247,7 @@ def _init_parsers():
 # ============================================================
 def _flush_buffer():
     """刷新缓存：将数据放入异步写入队列（不阻塞）"""
-    global _buffer_count, _write_queue
+    global _buffer_count, _write_queue, _fallback_executor
     
     if len(_point_buffer) == 0:
         return
@@ -213,40 +261,65 @@ def _flush_buffer():
     if _write_queue is not None:
         try:
             _write_queue.put_nowait(points)
-            print(f"[轮询] 已将 {len(points)} 个数据点加入写入队列")
+            logger.debug("[轮询] 已将 %d 个数据点加入写入队列", len(points))
         except asyncio.QueueFull:
-            print(f"[轮询] 写入队列已满，数据转存到本地缓存")
+            logger.warning("[轮询] 写入队列已满，数据转存到本地缓存")
             _save_to_local_cache(points)
     else:
         # [FIX] 队列未初始化，在线程池中执行同步写入（降级），避免阻塞事件循环
-        import concurrent.futures
         try:
-            executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
-            executor.submit(_sync_write_to_influx, points)
-            executor.shutdown(wait=False)
-            print(f"[轮询] 队列未就绪，已提交 {len(points)} 个数据点到后台线程写入")
+            if _fallback_executor is None:
+                _fallback_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="influx-fallback-writer"
+                )
+            _fallback_executor.submit(_sync_write_to_influx, points)
+            logger.info("[轮询] 队列未就绪，已提交 %d 个数据点到后台线程写入", len(points))
         except Exception as e:
-            print(f"[轮询] 降级写入提交失败: {e}，转存到本地缓存")
+            logger.warning("[轮询] 降级写入提交失败: %s，转存到本地缓存", e)
             _save_to_local_cache(points)
 
 
+def _cached_influx_health() -> Optional[Tuple[bool, str]]:
+    """返回 TTL 内的健康探测结果，过期返回 None"""
+    checked_at, healthy, msg = _influx_health
+    if time.monotonic() - checked_at < _INFLUX_HEALTH_TTL:
+        return healthy, msg
+    return None
+
+
+def _probe_influx_health() -> Tuple[bool, str]:
+    """执行一次健康探测并刷新缓存 (同步调用，异步上下文中须通过 asyncio.to_thread 执行)"""
+    global _influx_health
+    healthy, msg = check_influx_health()
+    _influx_health = (time.monotonic(), healthy, msg)
+    return healthy, msg
+
+
+def _invalidate_influx_health() -> None:
+    """写入失败后让健康缓存失效"""
+    global _influx_health
+    _influx_health = (float("-inf"), False, "")
+
+
 def _sync_write_to_influx(points: List):
     """同步写入 InfluxDB（降级模式）"""
     global _stats
     
-    healthy, msg = check_influx_health()
+    healthy, msg = _cached_influx_health() or _probe_influx_health()
     
     if healthy:
         success, err = write_points_batch(points)
         if success:
             _stats["successful_writes"] += len(points)
             _stats["last_write_time"] = beijing_isoformat()
-            print(f"[轮询] 批量写入 {len(points)} 个数据点到 InfluxDB")
+            _note_written(points)
+            logger.debug("[轮询] 批量写入 %d 个数据点到 InfluxDB", len(points))
         else:
-            print(f"[轮询] InfluxDB 写入失败: {err}，转存到本地缓存")
+            _invalidate_influx_health()
+            logger.warning("[轮询] InfluxDB 写入失败: %s，转存到本地缓存", err)
             _save_to_local_cache(points)
     else:
-        print(f"[轮询] InfluxDB 不可用 ({msg})，数据写入本地缓存")
+        logger.warning("[轮询] InfluxDB 不可用 (%s)，数据写入本地缓存", msg)
         _save_to_local_cache(points)
 
 
@@ -273,8 +346,9 @@ async def _background_writer():
             
             _write_in_progress = True
             
-            # [FIX] 使用 asyncio.to_thread() 避免阻塞事件循环
-            healthy, msg = await asyncio.to_thread(check_influx_health)
+            # [FIX] 使用 asyncio.to_thread() 避免阻塞事件循环 (缓存命中时无需探测)
+            health = _cached_influx_health()
+            healthy, msg = health if health is not None else await asyncio.to_thread(_probe_influx_health)
             
             if healthy:
                 # [FIX] 使用 asyncio.to_thread() 避免阻塞事件循环
@@ -283,14 +357,17 @@ async def _background_writer():
                 if success:
                     _stats["successful_writes"] += len(points)
                     _stats["last_write_time"] = beijing_isoformat()
-                    print(f"[后台写入] 批量写入 {len(points)} 个数据点到 InfluxDB")
+                    _note_written(points)
+                    logger.debug("[后台写入] 批量写入 %d 个数据点到 InfluxDB", len(points))
                 else:
-                    print(f"[后台写入] InfluxDB 写入失败: {err}，转存到本地缓存")
-                    _save_to_local_cache(points)
+                    _invalidate_influx_health()
+                    logger.warning("[后台写入] InfluxDB 写入失败: %s，转存到本地缓存", err)
+                    # SQLite 写入 (持锁 + commit) 同样在线程池中执行，InfluxDB 故障期间不拖慢轮询和推送
+                    await asyncio.to_thread(_save_to_local_cache, points)
             else:
                 # InfluxDB 不可用，保存到本地
-                print(f"[后台写入] InfluxDB 不可用 ({msg})，数据写入本地缓存")
-                _save_to_local_cache(points)
+                logger.warning("[后台写入] InfluxDB 不可用 (%s)，数据写入本地缓存", msg)
+                await asyncio.to_thread(_save_to_local_cache, points)
             
             _write_in_progress = False
             _write_queue.task_done()
@@ -299,35 +376,50 @@ async def _background_writer():
             print("[后台写入] 任务已取消")
             break
         except Exception as e:
-            print(f"[后台写入] 任务异常: {e}")
+            logger.error("[后台写入] 任务异常: %s", e)
             _write_in_progress = False
             await asyncio.sleep(1)
     
     print("[后台写入] 任务已停止")
 
 
+def _point_time(point) -> Optional[datetime]:
+    """取 Point 的时间戳，纳秒整数时间戳 (轮询写入路径) 还原为 UTC datetime"""
+    ts = point._time
+    if isinstance(ts, int):
+        ts = datetime.fromtimestamp(ts // 1_000_000_000, timezone.utc).replace(microsecond=ts // 1000 % 1_000_000)
+    return ts
+
+
+def _note_written(points: List) -> None:
+    """把本批最新时间同步给历史查询服务 (批内按轮询顺序排列，最后一个点最新)"""
+    ts = _point_time(points[-1])
+    if ts is not None:
+        note_db_write(ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc))
+
+
 def _save_to_local_cache(points: List):
     """保存数据点到本地 SQLite 缓存"""
     global _stats
     
     cache = get_local_cache()
-    cached_points = []
     
-    for point in points:
-        # 提取 Point 对象的信息
-        cached_point = CachedPoint(
+    # tags/fields 直接引用 Point 内部字典: CachedPoint 只做序列化，不会修改它们
+    cached_points = [
+        CachedPoint(
             measurement=point._name,
-            tags={k: v for k, v in point._tags.items()},
-            fields={k: v for k, v in point._fields.items()},
-            timestamp=point._time.isoformat() if point._time else beijing_isoformat()
+            tags=point._tags,
+            fields=point._fields,
+            timestamp=ts.isoformat() if (ts := _point_time(point)) else beijing_isoformat()
         )
-        cached_points.append(cached_point)
+        for point in points
+    ]
     
     saved_count = cache.save_points(cached_points)
     _stats["cached_points"] += saved_count
     _stats["failed_writes"] += len(points)
     
-    print(f"[本地缓存] 已保存 {saved_count} 个数据点到本地缓存")
+    logger.info("[本地缓存] 已保存 %d 个数据点到本地缓存", saved_count)
 
 
 # ============================================================
@@ -344,7 +436,8 @@ async def _retry_cached_data():
         await asyncio.sleep(retry_interval)
         
         # [FIX] 使用 asyncio.to_thread() 避免阻塞事件循环
-        healthy, _ = await asyncio.to_thread(check_influx_health)
+        health = _cached_influx_health()
+        healthy, _ = health if health is not None else await asyncio.to_thread(_probe_influx_health)
         if not healthy:
             continue
         
@@ -354,11 +447,12 @@ async def _retry_cached_data():
         if not pending:
             continue
         
-        print(f"[缓存重试] 开始重试 {len(pending)} 条缓存数据...")
+        logger.info("[缓存重试] 开始重试 %d 条缓存数据...", len(pending))
         
         # 重新构建 Point 对象
         points = []
         ids = []
+        dead_ids = []  # 无法重建的记录（无有效字段/时间戳损坏），与成功记录合并为一次删除
         
         for point_id, cached_point in pending:
             try:
@@ -366,28 +460,34 @@ async def _retry_cached_data():
                     cached_point.measurement,
                     cached_point.tags,
                     cached_point.fields,
-                    datetime.fromisoformat(cached_point.timestamp)
+                    parse_iso_datetime(cached_point.timestamp)
                 )
                 if point:
                     points.append(point)
                     ids.append(point_id)
+                else:
+                    dead_ids.append(point_id)
             except Exception as e:
-                print(f"[缓存重试] 重建 Point 失败: {e}")
+                dead_ids.append(point_id)
+                logger.warning("[缓存重试] 重建 Point 失败: %s", e)
         
         if not points:
+            cache.mark_success(dead_ids)
             continue
         
         # [FIX] 使用 asyncio.to_thread() 避免阻塞事件循环
         success, err = await asyncio.to_thread(write_points_batch, points)
         
         if success:
-            cache.mark_success(ids)
+            cache.mark_success(ids + dead_ids)
             _stats["retry_success"] += len(points)
             _stats["last_retry_time"] = beijing_isoformat()
-            print(f"[缓存重试] 重试成功: {len(points)} 条数据已写入 InfluxDB")
+            logger.info("[缓存重试] 重试成功: %d 条数据已写入 InfluxDB", len(points))
         else:
+            _invalidate_influx_health()
+            cache.mark_success(dead_ids)
             cache.mark_retry(ids)
-            print(f"[缓存重试] 重试失败: {err}")
+            logger.warning("[缓存重试] 重试失败: %s", err)
 
 
 # ============================================================
@@ -426,13 +526,17 @@ async def _poll_data():
     """
     global _buffer_count, _stats, _latest_data, _latest_timestamp
     
-    # 从配置文件加载DB块配置
-    db_configs = _load_db_mappings()
+    # 复用 start_polling 已解析的DB块配置，避免重复读取 db_mappings.yaml
+    db_configs = _db_configs or _load_db_mappings()
     
     poll_count = 0
+
+    # 运行模式在进程生命周期内不变，绑定为局部变量，循环内不再重复读取 settings
+    mock_mode = settings.mock_mode
+    verbose_log = settings.verbose_polling_log
     
     # 根据模式初始化数据源
-    if settings.mock_mode:
+    if mock_mode:
         # Mock模式：使用模拟数据生成器
         from app.services.mock_service import MockService
         print("[轮询] Mock模式已启用 - 使用模拟数据")
@@ -450,36 +554,16 @@ async def _poll_data():
             # ============================================================
             # Step 1: 读取所有 DB 块数据
             # ============================================================
+            # 解析 -> 转换只做一次: _update_latest_data() 返回的转换结果同时用于报警检查和写入缓冲区
             all_devices = []
             
-            if settings.mock_mode:
+            if mock_mode:
                 # Mock模式：生成模拟数据 (PLC原始格式)
                 mock_data = MockService.generate_hopper_data()
                 
                 # 与真实PLC相同的处理流程: converter转换 -> 更新缓存
-                _alarm_pending = []
                 for device_id, device_data in mock_data.items():
-                    all_devices.append(device_data)
-                    alarm_info = _update_latest_data(device_data, 4, timestamp)
-                    if alarm_info:
-                        _alarm_pending.append(alarm_info)
-                
-                _latest_timestamp = timestamp
-                # 通知 WS 推送新数据已就绪
-                get_data_updated_event().set()
-
-                # [FIX] 报警检查通过线程池执行，避免 InfluxDB 写入阻塞事件循环
-                for info in _alarm_pending:
-                    try:
-                        await asyncio.to_thread(
-                            check_device_alarm,
-                            device_id=info["device_id"],
-                            device_type=info["device_type"],
-                            modules_data=info["modules_data"],
-                            timestamp=info["timestamp"],
-                        )
-                    except Exception as e:
-                        print(f"[轮询] 报警检查异常: {e}")
+                    all_devices.append(_update_latest_data(device_data, 4, timestamp))
             else:
                 # 正常模式：从PLC读取数据
                 for db_num, size in db_configs:
@@ -487,46 +571,41 @@ async def _poll_data():
                     success, db_data, err = await asyncio.to_thread(plc.read_db, db_num, 0, size)
                     
                     if not success:
-                        print(f"[轮询] DB{db_num} 读取失败: {err}")
+                        logger.warning("[轮询] DB%s 读取失败: %s", db_num, err)
                         continue
                     
-                    # 解析设备数据
+                    # 解析设备数据并更新内存缓存
                     if db_num in _parsers:
-                        devices = _parsers[db_num].parse_all(db_data)
-                        all_devices.extend(devices)
-                        
-                        # 更新内存缓存
-                        _alarm_pending_plc = []
-                        for device in devices:
-                            alarm_info = _update_latest_data(device, db_num, timestamp)
-                            if alarm_info:
-                                _alarm_pending_plc.append(alarm_info)
-                
-                # 更新时间戳
-                _latest_timestamp = timestamp
-                # 通知 WS 推送新数据已就绪
-                get_data_updated_event().set()
-
-                # [FIX] 报警检查通过线程池执行，避免 InfluxDB 写入阻塞事件循环
-                for info in _alarm_pending_plc:
-                    try:
-                        await asyncio.to_thread(
-                            check_device_alarm,
-                            device_id=info["device_id"],
-                            device_type=info["device_type"],
-                            modules_data=info["modules_data"],
-                            timestamp=info["timestamp"],
-                        )
-                    except Exception as e:
-                        print(f"[轮询] 报警检查异常: {e}")
+                        for device in _parsers[db_num].parse_all(db_data):
+                            all_devices.append(_update_latest_data(device, db_num, timestamp))
+            
+            # 更新时间戳
+            _latest_timestamp = timestamp
+            # 通知 WS 推送新数据已就绪
+            get_data_updated_event().set()
+
+            # [FIX] 报警检查通过线程池执行，避免 InfluxDB 写入阻塞事件循环
+            for info in all_devices:
+                try:
+                    await asyncio.to_thread(
+                        check_device_alarm,
+                        device_id=info["device_id"],
+                        device_type=info["device_type"],
+                        modules_data=info["modules_data"],
+                        timestamp=info["timestamp"],
+                    )
+                except Exception as e:
+                    logger.warning("[轮询] 报警检查异常: %s", e)
             
             # ============================================================
             # Step 2: 将数据加入写入缓冲区
             # ============================================================
             written_count = 0
+            # 本轮所有 Point 共用同一时间戳，换算成纳秒整数一次
+            tick_ns = timestamp_ns(timestamp)
             for device in all_devices:
                 db_num = device.get('db_number', 4) if isinstance(device, dict) else 4
-                count = _add_device_to_buffer(device, db_num, timestamp)
+                count = _add_device_to_buffer(device, db_num, tick_ns)
                 written_count += count
             
             # 检查是否需要批量写入
@@ -535,25 +614,23 @@ async def _poll_data():
             # 缓冲区告警阈值
             buffer_usage = len(_point_buffer) / 1000
             if buffer_usage > 0.5:
-                print(f"[轮询] 缓冲区使用率过高: {buffer_usage*100:.1f}% (将触发批量写入)")
+                logger.warning("[轮询] 缓冲区使用率过高: %.1f%% (将触发批量写入)", buffer_usage * 100)
             
             # 触发批量写入：达到批次数或缓冲区>500个点
             if _buffer_count >= _batch_size or len(_point_buffer) >= 500:
                 _flush_buffer()
             
-            # 日志输出
-            if settings.verbose_polling_log or poll_count % 10 == 0:
+            # 日志输出 (INFO 未启用时连本地缓存统计查询也跳过)
+            if (verbose_log or poll_count % 10 == 0) and logger.isEnabledFor(logging.INFO):
                 cache_stats = get_local_cache().get_stats()
-                print(f"[轮询 #{poll_count}] "
-                      f"设备: {len(all_devices)} | "
-                      f"数据点: {written_count} | "
-                      f"缓冲区={len(_point_buffer)}/{_batch_size} | "
-                      f"待重试={cache_stats['pending_count']}")
+                logger.info(
+                    "[轮询 #%d] 设备: %d | 数据点: %d | 缓冲区=%d/%d | 待重试=%d",
+                    poll_count, len(all_devices), written_count,
+                    len(_point_buffer), _batch_size, cache_stats['pending_count']
+                )
         
         except Exception as e:
-            print(f"[轮询 #{poll_count}] 轮询异常: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error("[轮询 #%d] 轮询异常: %s", poll_count, e, exc_info=True)
         
         # 使用配置的轮询间隔
         await asyncio.sleep(_poll_interval)
@@ -600,13 +677,20 @@ def _update_latest_data(device_data: Dict[str, Any], db_number: int, timestamp:
     
     # 更新内存缓存
     with _data_lock:
-        _latest_data[device_id] = {
+        is_new_device = device_id not in _latest_data
+        entry = {
             "device_id": device_id,
             "device_name": device_name,
             "device_type": device_type,
             "timestamp": timestamp.isoformat(),
             "modules": modules_data
         }
+        _latest_data[device_id] = entry
+        _latest_by_type.setdefault(device_type, {})[device_id] = entry
+
+    # 首次出现的设备: 让历史服务的设备列表缓存失效
+    if is_new_device:
+        invalidate_device_list_cache()
 
     # [FIX] 报警检查已移到 _poll_data() 中通过 asyncio.to_thread() 调用
     # 避免 log_alarm() -> write_point() 同步 InfluxDB 写入阻塞事件循环
@@ -621,50 +705,52 @@ def _update_latest_data(device_data: Dict[str, Any], db_number: int, timestamp:
 # ============================================================
 # 将设备数据加入写入缓冲区
 # ============================================================
-def _add_device_to_buffer(device_data: Dict[str, Any], db_number: int, timestamp: datetime) -> int:
+# InfluxDB tag 字典缓存 {(device_id, module_tag, module_type, db_number): tags}
+_point_tags_cache: Dict[Tuple[str, str, str, int], Dict[str, str]] = {}
+
+
+def _add_device_to_buffer(device_info: Dict[str, Any], db_number: int, timestamp: Union[datetime, int]) -> int:
     """将设备数据加入写入缓冲区
     
     Args:
-        device_data: 解析后的设备数据
+        device_info: _update_latest_data() 返回的已转换数据
+                     {device_id, device_type, modules_data: {module_tag: {module_type, fields}}}
         db_number: DB块号
-        timestamp: 时间戳
+        timestamp: 时间戳 (datetime 或 timestamp_ns() 纳秒整数)
     
     Returns:
         添加的数据点数量
     """
-    device_id = device_data['device_id']
-    device_type = device_data['device_type']
+    device_id = device_info['device_id']
+    device_type = device_info['device_type']
     point_count = 0
     
-    # 遍历所有模块
-    for module_tag, module_data in device_data['modules'].items():
+    # 遍历所有模块 (字段已在更新缓存时转换，不再重复调用转换器)
+    for module_tag, module_data in device_info['modules_data'].items():
         module_type = module_data['module_type']
-        raw_fields = module_data['fields']
-        
-        # 使用转换器转换数据
-        if module_type in CONVERTER_MAP:
-            converter = get_converter(module_type)
-            fields = converter.convert(raw_fields)
-        else:
-            # 未知模块类型，直接提取原始值
-            fields = {}
-            for field_name, field_info in raw_fields.items():
-                fields[field_name] = field_info['value']
+        fields = module_data['fields']
         
         # 跳过空字段
         if not fields:
             continue
         
-        # 构建 Point 对象
-        point = build_point(
-            measurement="sensor_data",
-            tags={
+        # 每个模块的 tag 组合固定不变，首次构建后复用 (省去每轮询周期的 dict 构建和 str(db_number))
+        tag_key = (device_id, module_tag, module_type, db_number)
+        tags = _point_tags_cache.get(tag_key)
+        if tags is None:
+            tags = {
                 "device_id": device_id,
                 "device_type": device_type,
                 "module_type": module_type,
                 "module_tag": module_tag,
                 "db_number": str(db_number)
-            },
+            }
+            _point_tags_cache[tag_key] = tags
+        
+        # 构建 Point 对象
+        point = build_point(
+            measurement="sensor_data",
+            tags=tags,
             fields=fields,
             timestamp=timestamp
         )
@@ -681,14 +767,14 @@ def _add_device_to_buffer(device_data: Dict[str, Any], db_number: int, timestamp
 # ------------------------------------------------------------
 async def start_polling():
     """启动数据轮询任务（从配置文件动态加载）"""
-    global _polling_task, _retry_task, _cleanup_task, _write_task, _is_running, _batch_size, _poll_interval, _write_queue
+    global _polling_task, _retry_task, _cleanup_task, _write_task, _is_running, _batch_size, _poll_interval, _write_queue, _db_configs
     
     if _is_running:
         print("[轮询] 轮询服务已在运行")
         return
     
-    # 加载DB映射配置
-    _load_db_mappings()
+    # 加载DB映射配置（只解析一次，轮询循环直接复用）
+    _db_configs = _load_db_mappings()
     
     # 动态初始化解析器
     print("[轮询] 初始化解析器:")
@@ -813,10 +899,8 @@ def get_latest_devices_by_type(device_type: str) -> List[Dict[str, Any]]:
         设备数据列表
     """
     with _data_lock:
-        return [
-            data for data in _latest_data.values()
-            if data.get('device_type') == device_type
-        ]
+        by_id = _latest_by_type.get(device_type)
+        return list(by_id.values()) if by_id else []
 
 
 def get_latest_timestamp() -> Optional[str]:
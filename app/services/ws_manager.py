@@ -17,6 +17,7 @@ from starlette.websockets import WebSocketState
 
 from config import get_settings
 from app.models.ws_messages import RealtimeDataMessage
+from app.services.polling_service import get_data_updated_event, get_latest_data
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -83,24 +84,34 @@ class ConnectionManager:
         logger.debug(f"[WS] 收到心跳，连接数: {len(self.active_connections)}")
 
     async def broadcast(self, channel: str, message: dict):
-        """向指定频道的所有订阅者广播消息"""
-        disconnected = []
-        for ws, channels in self.active_connections.items():
-            if channel in channels:
-                try:
-                    if ws.application_state != WebSocketState.CONNECTED or ws.client_state != WebSocketState.CONNECTED:
-                        disconnected.append(ws)
-                        continue
-                    await ws.send_json(message)
-                except WebSocketDisconnect:
-                    disconnected.append(ws)
-                except Exception as e:
-                    logger.warning(f"[WS] 发送消息失败: {e}")
-                    disconnected.append(ws)
+        """向指定频道的所有订阅者广播消息
+
+        各客户端并发发送 (asyncio.gather)，单个慢客户端不会拖慢其他客户端；
+        先对订阅者列表做快照，避免发送期间连接增删导致字典迭代异常。
+        """
+        targets = [ws for ws, channels in self.active_connections.items() if channel in channels]
+        if not targets:
+            return
+
+        results = await asyncio.gather(*(self._send_json(ws, message) for ws in targets))
 
         # 清理断开的连接
-        for ws in disconnected:
-            self.disconnect(ws)
+        for ws, ok in zip(targets, results):
+            if not ok:
+                self.disconnect(ws)
+
+    async def _send_json(self, ws: WebSocket, message: dict) -> bool:
+        """发送消息给单个客户端，返回是否成功 (不抛异常)"""
+        try:
+            if ws.application_state != WebSocketState.CONNECTED or ws.client_state != WebSocketState.CONNECTED:
+                return False
+            await ws.send_json(message)
+            return True
+        except WebSocketDisconnect:
+            return False
+        except Exception as e:
+            logger.warning(f"[WS] 发送消息失败: {e}")
+            return False
 
     async def send_personal(self, websocket: WebSocket, message: dict):
         """发送消息给单个客户端"""
@@ -115,6 +126,19 @@ class ConnectionManager:
             logger.warning(f"[WS] 发送消息失败: {e}")
             self.disconnect(websocket)
 
+    async def send_personal_text(self, websocket: WebSocket, text: str):
+        """发送已序列化的 JSON 文本给单个客户端 (跳过逐条 JSON 编码)"""
+        try:
+            if websocket.application_state != WebSocketState.CONNECTED or websocket.client_state != WebSocketState.CONNECTED:
+                self.disconnect(websocket)
+                return
+            await websocket.send_text(text)
+        except WebSocketDisconnect:
+            self.disconnect(websocket)
+        except Exception as e:
+            logger.warning(f"[WS] 发送消息失败: {e}")
+            self.disconnect(websocket)
+
     def get_connection_count(self) -> int:
         """获取当前连接数"""
         return len(self.active_connections)
@@ -158,7 +182,6 @@ class ConnectionManager:
 
     async def _push_loop(self):
         """数据推送主循环 (事件驱动: 等待轮询服务通知新数据)"""
-        from app.services.polling_service import get_data_updated_event
         event = get_data_updated_event()
 
         while self._is_running:
@@ -182,8 +205,6 @@ class ConnectionManager:
 
     async def _push_realtime_data(self, timestamp: str):
         """推送实时数据 (realtime_data)"""
-        from app.services.polling_service import get_latest_data
-        
         # 从轮询服务的内存缓存获取最新数据
         latest = get_latest_data()
         
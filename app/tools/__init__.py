@@ -11,6 +11,8 @@
 #   - converter_vibration: 振动传感器转换
 # ============================================================
 
+import sys
+
 from .converter_base import BaseConverter
 from .converter_elec import ElectricityConverter
 from .converter_temp import TemperatureConverter
@@ -32,6 +34,13 @@ CONVERTER_MAP = {
     "vibration": VibrationConverter,
 }
 
+# 转换器输出字段名表 (字段名 -> 驻留字符串)，用于规范化查询参数中的字段名
+FIELD_NAMES = {
+    name: sys.intern(name)
+    for converter_cls in set(CONVERTER_MAP.values())
+    for name in converter_cls.OUTPUT_FIELDS
+}
+
 # 转换器实例缓存 (转换器无状态，可以复用单例)
 _converter_cache = {}
 
@@ -53,5 +62,6 @@ __all__ = [
     'PM10Converter',
     'VibrationConverter',
     'CONVERTER_MAP',
+    'FIELD_NAMES',
     'get_converter',
 ]
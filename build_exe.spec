@@ -20,6 +20,18 @@ a = Analysis(
         # FastAPI / Uvicorn
         'uvicorn',
         'fastapi',
+        # Uvicorn 按字符串动态加载 loop/protocol 实现，需显式声明，
+        # 否则打包后 "auto" 找不到 httptools/websockets，回退到纯 Python 的 h11
+        'uvicorn.loops.auto',
+        'uvicorn.loops.asyncio',
+        'uvicorn.protocols.http.auto',
+        'uvicorn.protocols.http.httptools_impl',
+        'uvicorn.protocols.http.h11_impl',
+        'uvicorn.protocols.websockets.auto',
+        'uvicorn.protocols.websockets.websockets_impl',
+        'uvicorn.lifespan.on',
+        'httptools',
+        'websockets',
         # PyQt5 (系统托盘)
         'PyQt5',
         # Snap7 (PLC通信) - python-snap7 2.0.2 使用 snap7.type (非 types)
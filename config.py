@@ -135,7 +135,7 @@ class Settings(BaseSettings):
 # ------------------------------------------------------------
 # 获取配置单例
 # ------------------------------------------------------------
-@lru_cache()
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
     """获取配置单例"""
     settings = Settings()
@@ -9,6 +9,7 @@ FastAPI 应用入口 - 料仓监控系统
 """
 
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import logging.handlers
 import sys
@@ -18,6 +19,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.routers import health, config, hopper_4, alarms, websocket
+from app.models.response import FastJSONResponse
 from app.services.polling_service import start_polling, stop_polling
 from app.services.ws_manager import get_ws_manager
 from config import get_settings
@@ -154,6 +156,11 @@ async def lifespan(app: FastAPI):
     else:
         logger.info("[启动] InfluxDB 迁移失败，但服务继续启动\n")
     
+    # 2.1 预热共享客户端连接池 (迁移使用独立客户端)，首个历史查询无需再建立连接
+    from app.core.influxdb import ping_influx
+    _, msg = await asyncio.to_thread(ping_influx)
+    logger.info("[启动] InfluxDB 连接预热: %s", msg)
+    
     # 3. 启动轮询服务 (根据环境变量决定是否启用)
     if settings.enable_polling:
         await start_polling()
@@ -199,7 +206,9 @@ def create_app() -> FastAPI:
         title="Ceramic Hopper Backend",
         description="陶瓷料仓监控系统后端API",
         version="1.0.0",
-        lifespan=lifespan
+        lifespan=lifespan,
+        # 默认响应类: 安装 orjson 时使用 ORJSONResponse，大体量设备数据序列化更快
+        default_response_class=FastJSONResponse
     )
     
     # CORS 配置 - 允许前端访问
@@ -30,4 +30,6 @@ pip install -r requirements.txt > /dev/null
 # 启动后端
 echo "[步骤] 启动后端服务..."
 echo "=========================================="
-uvicorn main:app --reload --host 0.0.0.0 --port 8080
+# uvicorn[standard] 已包含 uvloop (非 Windows) 与 httptools，--loop/--http auto 时自动启用
+# 注意: 只能单进程运行 (PLC 轮询与内存缓存是进程内单例)，不要加 --workers
+uvicorn main:app --reload --host 0.0.0.0 --port 8080 --loop auto --http auto
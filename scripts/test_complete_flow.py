@@ -15,7 +15,7 @@ from app.plc.parser_hopper import HopperParser
 from app.plc.parser_roller_kiln import RollerKilnParser
 from app.plc.parser_scr_fan import SCRFanParser
 from app.core.influxdb import write_point
-from app.services.history_query_service import HistoryQueryService
+from app.services.history_query_service import get_history_service
 
 
 def generate_realistic_plc_data(db_size: int, data_type: str = "random") -> bytes:
@@ -192,7 +192,7 @@ def test_query_history():
     print("  测试2: 查询历史数据")
     print("="*80)
     
-    service = HistoryQueryService()
+    service = get_history_service()
 
     end_time = datetime.now()
     start_time = end_time - timedelta(hours=1)
@@ -223,7 +223,7 @@ def test_latest_timestamp():
     print("  测试3: 查询最新时间戳")
     print("="*80)
 
-    service = HistoryQueryService()
+    service = get_history_service()
 
     latest = service.get_latest_db_timestamp()
     print(f"\n最新时间戳: {latest.isoformat() if latest else '无数据'}")
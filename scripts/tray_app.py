@@ -406,6 +406,8 @@ class ServerController:
                 log_level="info",
                 log_config=None,  # 禁用默认日志配置，使用我们的配置
                 access_log=True,
+                loop="auto",  # 已安装 uvloop 时使用 (Windows 不支持，回退 asyncio)
+                http="auto",  # 已安装 httptools 时使用 C 实现的 HTTP 解析
             )
             self._uvicorn_server = uvicorn.Server(config)
 
@@ -0,0 +1,83 @@
+"""
+健康检查路由单元测试 (/health/diagnose 全 0 诊断，不连接 PLC/InfluxDB)
+"""
+
+import asyncio
+
+import pytest
+
+from app.routers import health
+
+
+@pytest.fixture
+def cache_state(monkeypatch):
+    """替换轮询缓存: state["timestamp"] 变化即模拟进入下一个轮询周期"""
+    state = {"timestamp": "2026-01-01T10:00:00", "data": {}}
+    monkeypatch.setattr(health, "get_cache_timestamp", lambda: state["timestamp"])
+    monkeypatch.setattr(health, "is_polling_running", lambda: True)
+    monkeypatch.setattr(health, "get_latest_data", lambda: state["data"])
+    monkeypatch.setattr(health, "_diagnose_cache", None)
+    return state
+
+
+def _module(module_type, **fields):
+    return {"module_type": module_type, "fields": fields}
+
+
+def _diagnose():
+    response = asyncio.run(health.diagnose_zero_data())
+    assert response.success
+    return response.data
+
+
+def test_diagnose_all_zero(cache_state):
+    cache_state["data"] = {
+        "hopper_unit_4": {"modules": {
+            "pm10": _module("pm10", pm10=0, pm2_5=0.0),
+            "temp": _module("temperature", temperature=0.0, status="ok"),
+        }},
+    }
+    result = _diagnose()
+    assert result["total_modules"] == 2
+    assert result["zero_module_count"] == 2
+    assert result["has_zero_data"] is True
+    assert result["truncated"] is False
+
+
+def test_diagnose_mixed_fields_same_module_type(cache_state):
+    """同类型模块的字段集合不同时，按各模块自己的字段判断"""
+    cache_state["data"] = {
+        "dev_1": {"modules": {
+            "m1": _module("electricity", Pt=0.0),
+            "m2": _module("electricity", Pt=0.0, ImpEp=12.5),
+            "m3": _module("electricity", Ua_0=0.0, I_0=0.0),
+            "m4": _module("electricity", Ua_0=220.0, I_0=0.0),
+            "m5": _module("electricity", online=False, name="meter"),
+        }},
+    }
+    result = _diagnose()
+    assert result["total_modules"] == 5
+    assert [m["module_tag"] for m in result["zero_modules"]] == ["m1", "m3"]
+
+
+def test_diagnose_truncated_and_cached_per_tick(cache_state):
+    zero_count = health._DIAGNOSE_MAX_ZERO_MODULES + 3
+    cache_state["data"] = {
+        "dev_1": {"modules": {f"z{i}": _module("pm10", pm10=0) for i in range(zero_count)}},
+        "dev_2": {"modules": {"ok": _module("pm10", pm10=5)}},
+    }
+    result = _diagnose()
+    assert result["truncated"] is True
+    assert result["zero_module_count"] == health._DIAGNOSE_MAX_ZERO_MODULES
+    # 截断后仍累计所有设备的模块总数
+    assert result["total_modules"] == zero_count + 1
+
+    # 同一轮询周期内直接返回缓存结果
+    cache_state["data"] = {"dev_3": {"modules": {"ok": _module("pm10", pm10=1)}}}
+    assert _diagnose() is result
+
+    # 进入下一个轮询周期后重新诊断
+    cache_state["timestamp"] = "2026-01-01T10:00:05"
+    result = _diagnose()
+    assert result["total_modules"] == 1
+    assert result["has_zero_data"] is False
@@ -0,0 +1,313 @@
+"""
+HistoryQueryService 单元测试 (不连接 InfluxDB)
+query_api 用 mock 替换，只验证查询拆分/结果合并逻辑
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from app.services import history_query_service as hqs
+
+
+# ------------------------------------------------------------
+# 多设备对比 (按设备并发查询)
+# ------------------------------------------------------------
+class _Record:
+    def __init__(self, time, value):
+        self._time = time
+        self._value = value
+
+    def get_time(self):
+        return self._time
+
+    def get_value(self):
+        return self._value
+
+
+def _fake_compare_stream(query):
+    """按 Flux 文本中的 device_id/_field 生成确定的序列: 值 = 设备序号 * 100 + 字段序号 * 10 + 分钟"""
+    device = query.split('r["device_id"] == "')[1].split('"')[0]
+    field = query.split('r["_field"] == "')[1].split('"')[0]
+    base = int(device.split("_")[-1]) * 100 + int(field[1:]) * 10
+    return iter([
+        _Record(datetime(2026, 1, 1, 2, minute, tzinfo=timezone.utc), base + minute)
+        for minute in range(0, 15, 5)
+    ])
+
+
+def test_multi_device_compare_concurrent_calls(monkeypatch):
+    query_api = mock.Mock()
+    query_api.query_stream.side_effect = _fake_compare_stream
+    monkeypatch.setattr(hqs.HistoryQueryService, "query_api", query_api)
+
+    service = hqs.HistoryQueryService()
+    devices = [f"hopper_{n}" for n in range(1, 7)]
+    fields = [f"f{n}" for n in range(1, 5)]
+    results = {}
+    errors = []
+
+    def worker(field):
+        try:
+            for _ in range(20):
+                results[field] = service.query_multi_device_compare(
+                    devices, field, datetime(2026, 1, 1, 10), datetime(2026, 1, 1, 11), interval="5m"
+                )
+        except Exception as e:  # pragma: no cover - 失败时才会进入
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(field,)) for field in fields]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    for field in fields:
+        rows = results[field]
+        assert [row["time"] for row in rows] == [
+            "2026-01-01T10:00:00+08:00", "2026-01-01T10:05:00+08:00", "2026-01-01T10:10:00+08:00"
+        ]
+        field_no = int(field[1:])
+        for minute, row in zip(range(0, 15, 5), rows):
+            assert row == {
+                "time": row["time"],
+                **{d: int(d.split("_")[-1]) * 100 + field_no * 10 + minute for d in devices},
+            }
+
+
+
+def test_single_device_field_averages_modules_per_time(monkeypatch):
+    """同一设备多个模块带同一字段时，按时间显式取平均，而不是丢掉 module_tag 后互相覆盖"""
+    query_api = mock.Mock()
+    query_api.query_stream.return_value = iter([])
+    monkeypatch.setattr(hqs.HistoryQueryService, "query_api", query_api)
+
+    hqs.HistoryQueryService()._query_single_device_field(
+        "hopper_unit_4", "temperature", datetime(2026, 1, 1), datetime(2026, 1, 2), None, "5m"
+    )
+    query = query_api.query_stream.call_args.args[0]
+    steps = [line.strip() for line in query.splitlines() if line.strip().startswith("|>")]
+    assert steps[-5:] == [
+        "|> aggregateWindow(every: 5m, fn: mean, createEmpty: false)",
+        '|> group(columns: ["_time"])',
+        "|> mean()",
+        "|> group()",
+        '|> sort(columns: ["_time"])',
+    ]
+
+# ------------------------------------------------------------
+# 长时间范围分段查询
+# ------------------------------------------------------------
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch_seconds(dt):
+    return int((dt - _EPOCH).total_seconds())
+
+
+def _assert_contiguous(ranges, start, end):
+    assert ranges[0][0] == start
+    assert ranges[-1][1] == end
+    for (_, prev_end), (next_start, _) in zip(ranges, ranges[1:]):
+        assert prev_end == next_start
+
+
+def test_split_time_range_short_range_is_single():
+    start = datetime(2026, 1, 1)
+    end = start + timedelta(days=1)
+    assert hqs._split_time_range(start, end, "1m") == [(start, end)]
+    # 非简单格式的间隔不拆分
+    long_end = start + timedelta(days=60)
+    assert hqs._split_time_range(start, long_end, "1h30m") == [(start, long_end)]
+
+
+def test_split_time_range_boundaries_aligned():
+    start = datetime(2026, 1, 1)
+    end = start + timedelta(days=32)
+    ranges = hqs._split_time_range(start, end, "5m")
+    assert len(ranges) > 1
+    _assert_contiguous(ranges, start, end)
+    chunk = _epoch_seconds(ranges[1][1]) - _epoch_seconds(ranges[1][0])
+    assert chunk % 300 == 0
+    for seg_start, seg_end in ranges[1:]:
+        assert _epoch_seconds(seg_start) % chunk == 0
+    for seg_start, seg_end in ranges[:-1]:
+        assert _epoch_seconds(seg_end) % chunk == 0
+
+
+def test_split_time_range_uneven_range():
+    """起止时间都不在窗口边界上: 首尾为不完整段，中间分段点仍对齐间隔"""
+    start = datetime(2026, 1, 1, 0, 7, 13)
+    end = start + timedelta(days=31, hours=5, minutes=3, seconds=11)
+    ranges = hqs._split_time_range(start, end, "5m")
+    assert len(ranges) > 2
+    _assert_contiguous(ranges, start, end)
+    chunk = _epoch_seconds(ranges[1][1]) - _epoch_seconds(ranges[1][0])
+    assert (ranges[0][1] - ranges[0][0]).total_seconds() < chunk
+    assert (ranges[-1][1] - ranges[-1][0]).total_seconds() <= chunk
+    for _, seg_end in ranges[:-1]:
+        assert _epoch_seconds(seg_end) % 300 == 0
+
+
+class _PivotRecord:
+    def __init__(self, time, values):
+        self._time = time
+        self.values = values
+
+    def get_time(self):
+        return self._time
+
+
+def _fake_history_stream(query):
+    """模拟 aggregateWindow(createEmpty: false) + pivot:
+    窗口按 epoch 对齐、被 range 截断，_time 为窗口 stop；值为窗口内的秒数 (窗口被切开时值会不同)
+    每个 module_tag 一张表，表内按时间升序
+    """
+    range_args = query.split("range(start: ")[1].split(")")[0]
+    start = datetime.fromisoformat(range_args.split("Z, stop: ")[0])
+    end = datetime.fromisoformat(range_args.split("stop: ")[1].rstrip("Z"))
+    step = int(query.split("aggregateWindow(every: ")[1].split("m,")[0]) * 60
+
+    windows = []
+    window_start = start
+    while window_start < end:
+        window_stop = min(_EPOCH + timedelta(seconds=(_epoch_seconds(window_start) // step + 1) * step), end)
+        windows.append((window_stop, (window_stop - window_start).total_seconds()))
+        window_start = window_stop
+
+    return iter([
+        _PivotRecord(stop.replace(tzinfo=timezone.utc), {
+            "result": "_result", "table": table, "module_tag": tag, "module_type": "pm10",
+            "pm10": seconds,
+        })
+        for table, tag in enumerate(("pm10_a", "pm10_b"))
+        for stop, seconds in windows
+    ])
+
+
+def test_split_history_matches_single_query(monkeypatch):
+    """分段并发查询合并后与单次查询结果完全一致: 分段边界处没有重复或缺失的窗口"""
+    query_api = mock.Mock()
+    query_api.query_stream.side_effect = _fake_history_stream
+    monkeypatch.setattr(hqs.HistoryQueryService, "query_api", query_api)
+    service = hqs.HistoryQueryService()
+
+    start = datetime(2026, 1, 1, 0, 7, 13)
+    end = start + timedelta(days=31, hours=5, minutes=3, seconds=11)
+    split_rows = service.query_device_history("hopper_unit_4", start, end, interval="5m")
+    split_calls = query_api.query_stream.call_count
+    assert split_calls > 1
+
+    monkeypatch.setattr(hqs, "_split_time_range", lambda s, e, interval: [(s, e)])
+    single_rows = service.query_device_history("hopper_unit_4", start, end, interval="5m")
+    assert query_api.query_stream.call_count == split_calls + 1
+
+    assert split_rows == single_rows
+    for tag in ("pm10_a", "pm10_b"):
+        times = [row["time"] for row in split_rows if row["module_tag"] == tag]
+        assert len(times) == len(set(times))
+        assert times == sorted(times)
+
+
+# ------------------------------------------------------------
+# 数据库最新时间戳 (写入路径快捷值 + TTL 缓存)
+# ------------------------------------------------------------
+def test_latest_db_timestamp_prefers_fresh_write_then_database(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(hqs.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(hqs, "_latest_written", None)
+    monkeypatch.setattr(hqs, "_latest_ts_cache", None)
+    db_time = [datetime(2026, 1, 1, 2, 0, tzinfo=timezone.utc)]
+    query_api = mock.Mock()
+    query_api.query_stream.side_effect = lambda query: iter([_Record(db_time[0], None)])
+    monkeypatch.setattr(hqs.HistoryQueryService, "query_api", query_api)
+    service = hqs.HistoryQueryService()
+
+    # 没有写入记录: 查询数据库并缓存
+    assert service.get_latest_db_timestamp() == db_time[0]
+    assert query_api.query_stream.call_count == 1
+
+    # 刚写入且比缓存的数据库值新: 直接返回写入时间
+    written = datetime(2026, 1, 1, 2, 0, 5, tzinfo=timezone.utc)
+    hqs.note_db_write(written)
+    assert service.get_latest_db_timestamp() == written
+    assert query_api.query_stream.call_count == 1
+
+    # 写入记录过期后回到数据库 (其他进程写入了更新的数据)
+    now[0] += hqs._LATEST_TS_TTL
+    db_time[0] = datetime(2026, 1, 1, 2, 0, 9, tzinfo=timezone.utc)
+    assert service.get_latest_db_timestamp() == db_time[0]
+    assert query_api.query_stream.call_count == 2
+
+    # 写入时间不比缓存的数据库值新: 使用数据库值
+    hqs.note_db_write(datetime(2026, 1, 1, 2, 0, 7, tzinfo=timezone.utc))
+    assert service.get_latest_db_timestamp() == db_time[0]
+    assert query_api.query_stream.call_count == 2
+
+
+# ------------------------------------------------------------
+# 设备最新数据 (逐级放大回溯范围)
+# ------------------------------------------------------------
+_LOOKBACK_SECONDS = {"-5m": 300, "-1h": 3600, "-1d": 86400, "-30d": 30 * 86400}
+
+
+class _LastRecord:
+    def __init__(self, device_id, module_tag, field, value, time):
+        self.values = {"device_id": device_id, "module_tag": module_tag, "module_type": module_tag}
+        self._field = field
+        self._value = value
+        self._time = time
+
+    def get_time(self):
+        return self._time
+
+    def get_field(self):
+        return self._field
+
+    def get_value(self):
+        return self._value
+
+
+def test_device_realtime_keeps_stale_modules(monkeypatch):
+    """一个模块仍在上报、另一个模块 2 天前停止上报: 两个模块的最后值都要返回"""
+    monkeypatch.setattr(hqs, "_realtime_lookback", {})
+    monkeypatch.setattr(hqs, "_realtime_module_tags", {})
+    now = datetime(2026, 1, 10, 12, 0, tzinfo=timezone.utc)
+    series = [
+        ("hopper_unit_4", "pm10", "pm10", 35.0, now - timedelta(minutes=1)),
+        ("hopper_unit_4", "temp", "temperature", 21.5, now - timedelta(days=2)),
+    ]
+    queries = []
+
+    def fake_stream(query):
+        queries.append(query)
+        lookback = query.split("range(start: ")[1].split(")")[0]
+        tags = [part.split('"')[0] for part in query.split('r["module_tag"] == "')[1:]]
+        return iter([
+            _LastRecord(*row)
+            for row in series
+            if (now - row[4]).total_seconds() <= _LOOKBACK_SECONDS[lookback]
+            and (not tags or row[1] in tags)
+        ])
+
+    query_api = mock.Mock()
+    query_api.query_stream.side_effect = fake_stream
+    monkeypatch.setattr(hqs.HistoryQueryService, "query_api", query_api)
+    service = hqs.HistoryQueryService()
+
+    expected_modules = {
+        "pm10": {"module_type": "pm10", "fields": {"pm10": 35.0}},
+        "temp": {"module_type": "temp", "fields": {"temperature": 21.5}},
+    }
+    for _ in range(4):
+        queries.clear()
+        realtime = service.query_device_realtime("hopper_unit_4")
+        assert realtime["modules"] == expected_modules
+        assert realtime["timestamp"] == "2026-01-10T19:59:00+08:00"
+
+    # 已知模块后: 先查较近的范围，只对缺失的 temp 放大到 30 天
+    assert "range(start: -30d)" not in queries[0]
+    assert "range(start: -30d)" in queries[-1]
+    assert 'r["module_tag"] == "temp"' in queries[-1]
+    assert 'r["module_tag"] == "pm10"' not in queries[-1]
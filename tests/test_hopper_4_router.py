@@ -0,0 +1,54 @@
+"""
+4号料仓路由辅助函数单元测试 (不连接 InfluxDB)
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from app.routers import hopper_4
+
+
+# ------------------------------------------------------------
+# 字段参数解析
+# ------------------------------------------------------------
+def test_parse_fields_accepts_raw_db6_fields():
+    """DB6 的 accel/accel_f/reserved 模块按解析器原始字段名写入，必须能查询"""
+    assert hopper_4._parse_fields("accel_x") == ["accel_x"]
+    assert hopper_4._parse_fields("vx,accel_x,temp") == ["vx", "accel_x", "temp"]
+    assert hopper_4._parse_fields("accel_f_z,reserved_y") == ["accel_f_z", "reserved_y"]
+
+
+def test_parse_fields_dedups_and_drops_invalid_names():
+    assert hopper_4._parse_fields(None) is None
+    assert hopper_4._parse_fields("vx, vx ,,vy") == ["vx", "vy"]
+    assert hopper_4._parse_fields('vx") |> drop(,temp') == ["temp"]
+    assert hopper_4._parse_fields('a"b') == []
+
+
+
+# ------------------------------------------------------------
+# 历史查询结果缓存
+# ------------------------------------------------------------
+def test_history_cache_keyed_by_utc_window(monkeypatch):
+    """同一 UTC 时间窗口 (北京时间 naive / 带时区) 命中缓存；窗口相差不足一个间隔也不共用结果"""
+    service = mock.Mock()
+    service.query_device_history.side_effect = lambda **kwargs: [{"start": kwargs["start"].isoformat()}]
+    monkeypatch.setattr(hopper_4, "get_history_service", lambda: service)
+    monkeypatch.setattr(hopper_4, "_history_cache", {})
+
+    def request(start, end):
+        return asyncio.run(hopper_4.get_hopper_history(
+            device_id="hopper_unit_4", start=start, end=end,
+            module_type=None, fields=None, interval="5m", stream=False,
+        ))
+
+    start = datetime(2026, 1, 20, 8, 0)
+    end = start + timedelta(hours=1)
+    request(start, end)
+    utc = timezone.utc
+    request(datetime(2026, 1, 20, 0, 0, tzinfo=utc), datetime(2026, 1, 20, 1, 0, tzinfo=utc))
+    assert service.query_device_history.call_count == 1
+
+    request(start + timedelta(minutes=1), end + timedelta(minutes=1))
+    assert service.query_device_history.call_count == 2